@@ -1,20 +1,63 @@
-from genetic import WEEK_DAYS, generate_weekly_schedule, format_time
+import genetic
+from genetic import WEEK_DAYS, RunController, assign_driver_b_schedule, genetic_algorithm
+from schedule_model import ScheduleTableModel
+from storage import open_week
+from timeline import Timeline
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QTableWidget, QTableWidgetItem, QComboBox, QWidget,
-    QMessageBox, QHeaderView, QHBoxLayout, QFrame)
-from PyQt5.QtGui import QFont, QColor, QPalette
-from PyQt5.QtCore import Qt
-from datetime import datetime, timedelta
+    QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QTableView, QComboBox, QWidget, QLineEdit,
+    QMessageBox, QHeaderView, QHBoxLayout, QFrame, QProgressBar)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+
+class SolverThread(QThread):
+    # решает дни недели в фоне: сначала выбранный в интерфейсе, остальные — по порядку
+    progress = pyqtSignal(int, int, int)  # день, поколение, лучший штраф
+    day_solved = pyqtSignal(int, object)  # день, расписание
+
+    def __init__(self, num_buses, drivers_type_a, drivers_type_b, first_day=0, parent=None):
+        super().__init__(parent)
+        self.fleet = (num_buses, drivers_type_a, drivers_type_b)
+        self.driver_b_schedule = assign_driver_b_schedule(drivers_type_b)
+        self.next_day = first_day
+        self.controller = None
+        self._cancelled = False
+
+    def prioritize(self, day_index):
+        # день, который нужен пользователю, решается следующим
+        self.next_day = day_index
+
+    def cancel(self):
+        self._cancelled = True
+        if self.controller is not None:
+            self.controller.cancel()
+
+    def run(self):
+        remaining = list(range(len(WEEK_DAYS)))
+        while remaining and not self._cancelled:
+            day_index = self.next_day if self.next_day in remaining else remaining[0]
+            remaining.remove(day_index)
+            self.controller = RunController(
+                max_generations=genetic.GENERATIONS,
+                progress=lambda c, d=day_index: self.progress.emit(d, c.generation, -c.best_fitness))
+            if self._cancelled:
+                break
+            schedule = genetic_algorithm(*self.fleet, day_index, self.driver_b_schedule, controller=self.controller)
+            if self.controller.stop_reason != "cancelled":
+                self.day_solved.emit(day_index, schedule)
 
-START_TIME = 6
-END_TIME = 27
 
 class ScheduleApp(QMainWindow):
-    def __init__(self, weekly_schedule, daily_driver_info):
+    def __init__(self, weekly_schedule=None, daily_driver_info=None, fleet=None):
+        # готовое расписание либо fleet = (автобусы, водители A, водители B) для решения в фоне
         super().__init__()
-        self.weekly_schedule = weekly_schedule
-        self.daily_driver_info = daily_driver_info
+        self.weekly_schedule = weekly_schedule if weekly_schedule is not None else [None] * len(WEEK_DAYS)
+        self.daily_driver_info = daily_driver_info if daily_driver_info is not None \
+            else {day: set() for day in WEEK_DAYS}
+        self.timelines = {}  # индекс занятости строится один раз на день
+        self.solver = None
+        self.schedule_model = ScheduleTableModel(self, seconds=True)
 
         self.setWindowTitle("Расписание автобусов")
         self.setGeometry(100, 100, 1000, 750)
@@ -27,6 +70,8 @@ class ScheduleApp(QMainWindow):
 
         self.setup_ui()
         self.update_schedule_table()
+        if fleet is not None:
+            self.start_solver(*fleet)
 
     def setup_ui(self):
         self.setStyleSheet(
@@ -52,12 +97,12 @@ class ScheduleApp(QMainWindow):
                 border: 1px solid #b3cde3;
                 padding: 2px;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #b3cde3;
                 gridline-color: #b3cde3;
                 background-color: white;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
             """
@@ -77,6 +122,12 @@ class ScheduleApp(QMainWindow):
 
         controls_layout.addWidget(QLabel("Выберите день недели:"))
         controls_layout.addWidget(self.day_selector)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Автобус или водитель (3, B, B3)")
+        self.filter_edit.textChanged.connect(self.schedule_model.set_filter)
+        controls_layout.addWidget(QLabel("Фильтр:"))
+        controls_layout.addWidget(self.filter_edit)
         controls_layout.addStretch()
 
         self.show_drivers_button = QPushButton("Показать сотрудников")
@@ -88,11 +139,11 @@ class ScheduleApp(QMainWindow):
 
         self.layout.addWidget(self.create_separator())
 
-        self.schedule_table = QTableWidget()
-        self.schedule_table.setColumnCount(6)
-        self.schedule_table.setHorizontalHeaderLabels([
-            "Автобус", "Тип водителя", "ID водителя", "Начало маршрута", "Конец маршрута", "Активные автобусы"
-        ])
+        self.schedule_table = QTableView()
+        self.schedule_table.setModel(self.schedule_model)
+        self.schedule_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  #без сортировки до щелчка
+        self.schedule_table.setSortingEnabled(True)
+        self.schedule_table.verticalHeader().hide()
         self.schedule_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.schedule_table.setAlternatingRowColors(True)
         self.schedule_table.setStyleSheet(
@@ -101,6 +152,46 @@ class ScheduleApp(QMainWindow):
 
         self.layout.addWidget(self.schedule_table)
 
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximum(genetic.GENERATIONS)
+        self.progress_bar.hide()
+        status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.progress_bar)
+        self.layout.addLayout(status_layout)
+
+    def start_solver(self, num_buses, drivers_type_a, drivers_type_b):
+        self.solver = SolverThread(num_buses, drivers_type_a, drivers_type_b, self.day_selector.currentIndex(), self)
+        self.solver.progress.connect(self.on_progress)
+        self.solver.day_solved.connect(self.on_day_solved)
+        self.solver.finished.connect(self.on_solver_finished)
+        self.progress_bar.show()
+        self.solver.start()
+
+    def on_progress(self, day_index, generation, penalty):
+        self.progress_bar.setValue(generation)
+        self.status_label.setText(f"Расчёт: {WEEK_DAYS[day_index]}, поколение {generation}, штраф {penalty}")
+
+    def on_day_solved(self, day_index, schedule):
+        self.weekly_schedule[day_index] = schedule
+        self.daily_driver_info[WEEK_DAYS[day_index]] = schedule.driver_ids()
+        self.timelines.pop(day_index, None)
+        if day_index == self.day_selector.currentIndex():
+            self.update_schedule_table()
+
+    def on_solver_finished(self):
+        self.progress_bar.hide()
+        solved = sum(schedule is not None for schedule in self.weekly_schedule)
+        self.status_label.setText("" if solved == len(WEEK_DAYS) else f"Рассчитано дней: {solved}")
+
+    def closeEvent(self, event):
+        # отменённый расчёт останавливается после текущего поколения и освобождает процессор
+        if self.solver is not None and self.solver.isRunning():
+            self.solver.cancel()
+            self.solver.wait()
+        super().closeEvent(event)
+
     def create_separator(self):
         line = QFrame()
         line.setFrameShape(QFrame.HLine)
@@ -108,66 +199,27 @@ class ScheduleApp(QMainWindow):
         line.setStyleSheet("background-color: #b3cde3;")
         return line
 
-    def format_time(self, time_obj):
-        if isinstance(time_obj, str):
-            time_obj = datetime.strptime(time_obj, "%H:%M")
-        if isinstance(time_obj, datetime):
-            return time_obj.strftime("%H:%M:%S")
-        elif isinstance(time_obj, timedelta):
-            total_seconds = int(time_obj.total_seconds())
-            hours = total_seconds // 3600
-            minutes = (total_seconds % 3600) // 60
-            seconds = total_seconds % 60
-            hours = hours % 24
-            return f"{hours:02}:{minutes:02}:{seconds:02}"
-        else:
-            raise TypeError("Unsupported type for time_obj")
-
-    def convert_to_minutes(self, time_obj):
-        if isinstance(time_obj, str):
-            time_obj = datetime.strptime(time_obj, "%H:%M")
-        if isinstance(time_obj, datetime):
-            return time_obj.hour * 60 + time_obj.minute
-        elif isinstance(time_obj, timedelta):
-            total_seconds = int(time_obj.total_seconds())
-            return total_seconds // 60
-        else:
-            raise TypeError("Unsupported type for time_obj")
-
     def update_schedule_table(self):
         day_index = self.day_selector.currentIndex()
         schedule = self.weekly_schedule[day_index]
+        if schedule is None:
+            self.schedule_model.set_schedule(None)
+            if self.solver is not None:
+                self.solver.prioritize(day_index)
+                self.status_label.setText(f"{WEEK_DAYS[day_index]}: расписание рассчитывается")
+            return
 
-        active_buses_count = {t: 0 for t in range(START_TIME * 60, END_TIME * 60 + 1, 5)}
-
-        self.schedule_table.setRowCount(len(schedule))
-        for row, record in enumerate(schedule):
-            start_time = record['start_time']
-            end_time = record['end_time']
-
-            start_minutes = self.convert_to_minutes(start_time)
-            end_minutes = self.convert_to_minutes(end_time)
-
-            for t in range(start_minutes, end_minutes, 5):
-                if t in active_buses_count:
-                    active_buses_count[t] += 1
-
-            start_time_str = self.format_time(start_time)
-            end_time_str = self.format_time(end_time)
-
-            self.schedule_table.setItem(row, 0, QTableWidgetItem(str(record['bus'])))
-            self.schedule_table.setItem(row, 1, QTableWidgetItem(record['driver_type']))
-            self.schedule_table.setItem(row, 2, QTableWidgetItem(record['driver_id']))
-            self.schedule_table.setItem(row, 3, QTableWidgetItem(start_time_str))
-            self.schedule_table.setItem(row, 4, QTableWidgetItem(end_time_str))
-
-            active_buses = active_buses_count[start_minutes]
-            self.schedule_table.setItem(row, 5, QTableWidgetItem(str(active_buses)))
+        if day_index not in self.timelines:
+            self.timelines[day_index] = Timeline.from_schedule(schedule)
+        self.schedule_model.set_schedule(schedule, self.timelines[day_index].at_many(schedule.start))
 
     def show_driver_info(self):
         day_index = self.day_selector.currentIndex()
         day = WEEK_DAYS[day_index]
         drivers = self.daily_driver_info[day]
+        if self.weekly_schedule[day_index] is None:
+            QMessageBox.information(self, "Сотрудники", f"Расписание на {day} ещё рассчитывается.")
+            return
         if not drivers:
             QMessageBox.information(self, "Сотрудники", f"В {day} не было работающих сотрудников.")
             return
@@ -175,13 +227,16 @@ class ScheduleApp(QMainWindow):
         driver_list = "\n".join(sorted(drivers))
         QMessageBox.information(self, "Сотрудники", f"В {day} работали следующие сотрудники:\n{driver_list}")
 
-num_buses = 10
-drivers_type_a = 5
-drivers_type_b = 7
-
-weekly_schedule, daily_driver_info = generate_weekly_schedule(num_buses, drivers_type_a, drivers_type_b)
-
-app = QApplication(sys.argv)
-window = ScheduleApp(weekly_schedule, daily_driver_info)
-window.show()
-sys.exit(app.exec_())
+if __name__ == "__main__":
+    num_buses = 10
+    drivers_type_a = 5
+    drivers_type_b = 7
+
+    app = QApplication(sys.argv)
+    if len(sys.argv) > 1:  #сохранённое расписание (storage) вместо расчёта
+        week = open_week(sys.argv[1])
+        window = ScheduleApp(week.weekly_schedule, week.daily_driver_info)
+    else:
+        window = ScheduleApp(fleet=(num_buses, drivers_type_a, drivers_type_b))
+    window.show()
+    sys.exit(app.exec_())
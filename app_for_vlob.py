@@ -1,7 +1,9 @@
-from vlob import WEEK_DAYS, generate_schedule_for_week, format_time
+from vlob import WEEK_DAYS, generate_schedule_for_week
+from schedule_model import ScheduleTableModel
+from storage import open_week
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QTableWidget, QTableWidgetItem, QComboBox, QWidget,
+    QApplication, QMainWindow, QVBoxLayout, QPushButton, QLabel, QTableView, QComboBox, QWidget, QLineEdit,
     QMessageBox, QHeaderView, QHBoxLayout, QFrame)
 from PyQt5.QtGui import QFont, QColor, QPalette
 from PyQt5.QtCore import Qt
@@ -11,6 +13,7 @@ class ScheduleApp(QMainWindow):
         super().__init__()
         self.weekly_schedule = weekly_schedule
         self.daily_driver_info = daily_driver_info
+        self.schedule_model = ScheduleTableModel(self, row_color=self.row_color)
 
         self.setWindowTitle("Расписание автобусов")
         self.setGeometry(100, 100, 900, 700)
@@ -40,6 +43,12 @@ class ScheduleApp(QMainWindow):
 
         controls_layout.addWidget(QLabel("Выберите день недели:"))
         controls_layout.addWidget(self.day_selector)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Автобус или водитель (3, B, B3)")
+        self.filter_edit.textChanged.connect(self.schedule_model.set_filter)
+        controls_layout.addWidget(QLabel("Фильтр:"))
+        controls_layout.addWidget(self.filter_edit)
         controls_layout.addStretch()
 
         self.show_drivers_button = QPushButton("Показать сотрудников")
@@ -52,11 +61,11 @@ class ScheduleApp(QMainWindow):
 
         self.layout.addWidget(self.create_separator())
 
-        self.schedule_table = QTableWidget()
-        self.schedule_table.setColumnCount(6)
-        self.schedule_table.setHorizontalHeaderLabels([
-            "Автобус", "Тип водителя", "ID водителя", "Начало маршрута", "Конец маршрута", "Активные автобусы"
-        ])
+        self.schedule_table = QTableView()
+        self.schedule_table.setModel(self.schedule_model)
+        self.schedule_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  #без сортировки до щелчка
+        self.schedule_table.setSortingEnabled(True)
+        self.schedule_table.verticalHeader().hide()
         self.schedule_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.schedule_table.setAlternatingRowColors(True)
 
@@ -76,30 +85,14 @@ class ScheduleApp(QMainWindow):
 
     def update_schedule_table(self):
         day_index = self.day_selector.currentIndex()
-        schedule = self.weekly_schedule[day_index]
-
-        self.schedule_table.setRowCount(len(schedule))
-        for row, record in enumerate(schedule):
-            self.schedule_table.setItem(row, 0, QTableWidgetItem(str(record['bus'])))
-            self.schedule_table.setItem(row, 1, QTableWidgetItem(record['driver_type']))
-            self.schedule_table.setItem(row, 2, QTableWidgetItem(record['driver_id']))
-            self.schedule_table.setItem(row, 3, QTableWidgetItem(format_time(record['start_time'])))
-            self.schedule_table.setItem(row, 4, QTableWidgetItem(format_time(record['end_time'])))
-            self.schedule_table.setItem(row, 5, QTableWidgetItem(str(record['active_buses'])))
-
-            if record['active_buses'] > 0:
-                self.set_row_color(row, QColor(144, 238, 144))
-            else:
-                self.set_row_color(row, QColor(255, 99, 71))
-
-            if row % 2 == 0:
-                self.set_row_color(row, QColor(240, 248, 255))
-
-    def set_row_color(self, row, color):
-        for column in range(self.schedule_table.columnCount()):
-            item = self.schedule_table.item(row, column)
-            if item:
-                item.setBackground(color)
+        self.schedule_model.set_schedule(self.weekly_schedule[day_index])
+
+    @staticmethod
+    def row_color(model, row, trip):
+        # чётные строки подсвечены; остальные — по наличию активных автобусов
+        if row % 2 == 0:
+            return QColor(240, 248, 255)
+        return QColor(144, 238, 144) if model.active[trip] > 0 else QColor(255, 99, 71)
 
     def show_driver_info(self):
         day_index = self.day_selector.currentIndex()
@@ -113,13 +106,18 @@ class ScheduleApp(QMainWindow):
         QMessageBox.information(self, "Сотрудники", f"В {day} работали следующие сотрудники:\n{driver_list}")
 
 
-num_buses = 10
-drivers_type_a = 5
-drivers_type_b = 7
+if __name__ == "__main__":
+    num_buses = 10
+    drivers_type_a = 5
+    drivers_type_b = 7
 
-weekly_schedule, daily_driver_info = generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b)
+    if len(sys.argv) > 1:  #сохранённое расписание (storage) вместо расчёта
+        week = open_week(sys.argv[1])
+        weekly_schedule, daily_driver_info = week.weekly_schedule, week.daily_driver_info
+    else:
+        weekly_schedule, daily_driver_info = generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b)
 
-app = QApplication(sys.argv)
-window = ScheduleApp(weekly_schedule, daily_driver_info)
-window.show()
-sys.exit(app.exec_())
\ No newline at end of file
+    app = QApplication(sys.argv)
+    window = ScheduleApp(weekly_schedule, daily_driver_info)
+    window.show()
+    sys.exit(app.exec_())
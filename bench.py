@@ -0,0 +1,198 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import decomposed
+import genetic
+from genetic import (WEEK_DAYS, GAConfig, assign_driver_b_schedule, create_initial_population, crossover,
+                     fitness_function, genetic_algorithm, generate_weekly_schedule, mutate)
+from tuning import fleet
+from vlob import generate_schedule_for_week
+
+# Набор замеров для обоих планировщиков: время, пиковая память (tracemalloc) и итоговый штраф
+# на фиксированных seed. Результаты — JSON lines; режим --compare сверяет их с прошлым прогоном.
+
+DEFAULT_FLEETS = [10, 50, 100, 500, 1000]
+OPERATOR_PAIRS = 100  #пар скрещивание + мутация в замере операторов
+
+
+def week_penalty(weekly_schedule, num_buses):
+    return sum(-fitness_function(schedule, num_buses, day in ["СБ", "ВС"])
+               for day, schedule in zip(WEEK_DAYS, weekly_schedule))
+
+
+def bench_fitness(num_buses, drivers_a, drivers_b, config):
+    schedule = create_initial_population(num_buses, drivers_a, drivers_b, 0, assign_driver_b_schedule(drivers_b),
+                                         1)[0]
+
+    def run():
+        return -fitness_function(schedule, num_buses, False)
+    return run
+
+
+def bench_initial_population(num_buses, drivers_a, drivers_b, config):
+    driver_b_schedule = assign_driver_b_schedule(drivers_b)
+
+    def run():
+        population = create_initial_population(num_buses, drivers_a, drivers_b, 0, driver_b_schedule,
+                                               config.population_size)
+        return min(-fitness_function(schedule, num_buses, False) for schedule in population)
+    return run
+
+
+def bench_operators(num_buses, drivers_a, drivers_b, config):
+    driver_b_schedule = assign_driver_b_schedule(drivers_b)
+    parents = create_initial_population(num_buses, drivers_a, drivers_b, 0, driver_b_schedule, 2)
+
+    def run():
+        children = []
+        for _ in range(OPERATOR_PAIRS):
+            for child in crossover(parents[0], parents[1], 1.0):
+                children.append(mutate(child, drivers_a, drivers_b, 0, driver_b_schedule, 1.0))
+        return None
+    return run
+
+
+def bench_genetic_day(num_buses, drivers_a, drivers_b, config):
+    driver_b_schedule = assign_driver_b_schedule(drivers_b)
+
+    def run():
+        best = genetic_algorithm(num_buses, drivers_a, drivers_b, 0, driver_b_schedule, config=config)
+        return -fitness_function(best, num_buses, False)
+    return run
+
+
+def bench_genetic_week(num_buses, drivers_a, drivers_b, config):
+    def run():
+        weekly_schedule, _ = generate_weekly_schedule(num_buses, drivers_a, drivers_b, config=config)
+        return week_penalty(weekly_schedule, num_buses)
+    return run
+
+
+def bench_vlob_week(num_buses, drivers_a, drivers_b, config):
+    def run():
+        weekly_schedule, _ = generate_schedule_for_week(num_buses, drivers_a, drivers_b)
+        return week_penalty(weekly_schedule, num_buses)
+    return run
+
+
+def bench_decomposed_week(num_buses, drivers_a, drivers_b, config):
+    def run():
+        weekly_schedule, _ = decomposed.generate_weekly_schedule(num_buses, drivers_a, drivers_b)
+        return week_penalty(weekly_schedule, num_buses)
+    return run
+
+
+CASES = {
+    "fitness_function": bench_fitness,
+    "create_initial_population": bench_initial_population,
+    "crossover_mutate": bench_operators,
+    "genetic_algorithm": bench_genetic_day,
+    "generate_weekly_schedule": bench_genetic_week,
+    "vlob_week": bench_vlob_week,
+    "decomposed_week": bench_decomposed_week,
+}
+
+
+def measure(case, num_buses, seed, config, repeat=1):
+    # время — лучшее из repeat прогонов без tracemalloc, память — отдельный прогон под tracemalloc
+    num_buses, drivers_a, drivers_b = fleet(num_buses)
+    random.seed(seed)
+    run = CASES[case](num_buses, drivers_a, drivers_b, config)
+    seconds = []
+    for _ in range(repeat):
+        random.seed(seed)
+        started = time.perf_counter()
+        penalty = run()
+        seconds.append(time.perf_counter() - started)
+
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"case": case, "num_buses": num_buses, "drivers_a": drivers_a, "drivers_b": drivers_b, "seed": seed,
+            "population_size": config.population_size, "generations": config.generations,
+            "seconds": min(seconds), "peak_kib": peak / 1024, "penalty": penalty}
+
+
+def run_suite(cases, fleets, seeds, config, repeat=1, out=None):
+    results = []
+    for case in cases:
+        for num_buses in fleets:
+            for seed in seeds:
+                row = measure(case, num_buses, seed, config, repeat)
+                results.append(row)
+                if out is not None:
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+    return results
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _key(row):
+    return row["case"], row["num_buses"], row["seed"], row["population_size"], row["generations"]
+
+
+def compare(baseline, current, time_tolerance=0.2, memory_tolerance=0.2):
+    # регрессии: медленнее или прожорливее больше чем на tolerance, либо штраф вырос
+    reference = {_key(row): row for row in baseline}
+    regressions = []
+    for row in current:
+        base = reference.get(_key(row))
+        if base is None:
+            continue
+        problems = []
+        if row["seconds"] > base["seconds"] * (1 + time_tolerance):
+            problems.append(f"время {base['seconds']:.4f} -> {row['seconds']:.4f} с")
+        if row["peak_kib"] > base["peak_kib"] * (1 + memory_tolerance):
+            problems.append(f"память {base['peak_kib']:.0f} -> {row['peak_kib']:.0f} КиБ")
+        if base["penalty"] is not None and row["penalty"] is not None and row["penalty"] > base["penalty"]:
+            problems.append(f"штраф {base['penalty']} -> {row['penalty']}")
+        if problems:
+            regressions.append((row, problems))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности планировщиков")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--fleet", type=int, nargs="+", default=DEFAULT_FLEETS, help="размеры парка")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на замер времени")
+    parser.add_argument("--population", type=int, default=genetic.POPULATION_SIZE)
+    parser.add_argument("--generations", type=int, default=genetic.GENERATIONS)
+    parser.add_argument("-o", "--output", default="-", help="JSON lines с результатами ('-' — stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="сравнить с результатами прошлого прогона")
+    parser.add_argument("--time-tolerance", type=float, default=0.2)
+    parser.add_argument("--memory-tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    config = GAConfig.from_globals(population_size=args.population, generations=args.generations)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        results = run_suite(args.cases, args.fleet, args.seeds, config, args.repeat, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), results, args.time_tolerance, args.memory_tolerance)
+        for row, problems in regressions:
+            print(f"{row['case']} ({row['num_buses']} автобусов, seed {row['seed']}): " + "; ".join(problems),
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
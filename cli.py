@@ -0,0 +1,202 @@
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import decomposed
+from genetic import WEEK_DAYS, GAConfig, assign_driver_b_schedule, fitness_function, generate_weekly_schedule
+from horizon import plan_horizon
+from replan import replan_week
+from schedule import DRIVER_TYPES
+from storage import SolvedWeek, open_week, save_week, save_week_binary
+from vlob import generate_schedule_for_week
+
+# Пакетный запуск без GUI: несколько депо (num_buses, drivers_a, drivers_b) за один вызов,
+# генетический, жадный или двухэтапный (decomposed) планировщик, рейсы выводятся построчно в CSV или JSON lines.
+# Решённую неделю можно сохранить (--save-dir), а подкоманда replan перепланирует сохранённую неделю
+# под новый парк: python cli.py replan week.json 12:5:8 -o new.json
+
+ENGINES = ("genetic", "greedy", "decomposed")
+UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+FIELDS = ["depot", "day", "bus", "driver_type", "driver_id", "start_time", "end_time"]
+
+
+def parse_depot(spec):
+    # "10:5:7" или "north=10:5:7"
+    name, _, sizes = spec.rpartition("=")
+    try:
+        num_buses, drivers_a, drivers_b = (int(value) for value in sizes.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected [name=]buses:drivers_a:drivers_b, got {spec!r}")
+    return name or sizes, num_buses, drivers_a, drivers_b
+
+
+def read_depots(path):
+    # CSV с колонками name,num_buses,drivers_a,drivers_b
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["name"], int(row["num_buses"]), int(row["drivers_a"]), int(row["drivers_b"]))
+                for row in csv.DictReader(f)]
+
+
+def save_names(names):
+    # имена файлов для --save-dir: номер депо по порядку и имя без символов, недопустимых в путях
+    # (например, двоеточий "10:5:7" на Windows); номер различает депо с одинаковыми именами
+    return [f"{k}-{UNSAFE_CHARS.sub('_', name)}.json" for k, name in enumerate(names, 1)]
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def day_labels(days=None):
+    # неделя — названия дней, горизонт — номер дня и день недели
+    if days is None:
+        return list(WEEK_DAYS)
+    return [f"{day + 1}-{WEEK_DAYS[day % 7]}" for day in range(days)]
+
+
+def solve_depot(engine, num_buses, drivers_a, drivers_b, seed=None, config=None, days=None):
+    # days — горизонт в днях (см. horizon.plan_horizon); None — одна неделя, как в приложениях
+    if days is not None:
+        schedules, drivers, _ = plan_horizon(num_buses, drivers_a, drivers_b, days, engine=engine, seed=seed,
+                                             config=config)
+        return schedules, drivers
+    if engine == "greedy":
+        if seed is not None:
+            random.seed(seed)
+        return generate_schedule_for_week(num_buses, drivers_a, drivers_b)
+    if engine == "decomposed":
+        return decomposed.generate_weekly_schedule(num_buses, drivers_a, drivers_b, seed)
+    return generate_weekly_schedule(num_buses, drivers_a, drivers_b, seed=seed, config=config)
+
+
+def day_penalties(weekly_schedule, num_buses):
+    return [-fitness_function(schedule, num_buses, WEEK_DAYS[day % 7] in ["СБ", "ВС"])
+            for day, schedule in enumerate(weekly_schedule)]
+
+
+def save_solved(path, week):
+    # .json — JSON, иначе двоичный формат storage
+    (save_week if path.endswith(".json") else save_week_binary)(path, week)
+
+
+def trip_rows(depot, weekly_schedule, labels=WEEK_DAYS):
+    for day, schedule in zip(labels, weekly_schedule):
+        columns = zip(schedule.bus.tolist(), schedule.driver_type.tolist(), schedule.driver.tolist(),
+                      schedule.start.tolist(), schedule.end.tolist())
+        for bus, driver_type, driver, start, end in columns:
+            letter = DRIVER_TYPES[driver_type]
+            yield {"depot": depot, "day": day, "bus": bus, "driver_type": letter, "driver_id": f"{letter}{driver}",
+                   "start_time": format_minutes(start), "end_time": format_minutes(end)}
+
+
+class CsvWriter:
+    def __init__(self, out):
+        self.writer = csv.DictWriter(out, FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+
+class JsonLinesWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, row):
+        self.out.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["replan"]:
+        return replan_main(argv[1:])
+    parser = argparse.ArgumentParser(description="Расписание автобусов без графического интерфейса")
+    parser.add_argument("depots", nargs="*", type=parse_depot, metavar="[NAME=]BUSES:A:B",
+                        help="депо: число автобусов, водителей A и водителей B")
+    parser.add_argument("--depots-file", help="CSV с колонками name,num_buses,drivers_a,drivers_b")
+    parser.add_argument("--engine", choices=ENGINES, default="genetic")
+    parser.add_argument("--format", choices=list(WRITERS), default="csv")
+    parser.add_argument("-o", "--output", default="-", help="файл с рейсами ('-' — stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="депо, решаемых параллельно")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--population", type=int, default=None)
+    parser.add_argument("--generations", type=int, default=None)
+    parser.add_argument("--days", type=int, default=None,
+                        help="горизонт в днях с переносом цикла водителей B (по умолчанию одна неделя)")
+    parser.add_argument("--summary", action="store_true", help="штраф по дням каждого депо в stderr")
+    parser.add_argument("--save-dir", help="каталог, куда сохранить неделю каждого депо как <номер>-<депо>.json "
+                                           "(для подкоманды replan)")
+    args = parser.parse_args(argv)
+    if args.save_dir and args.days is not None:
+        parser.error("--save-dir saves a week and cannot be combined with --days")
+
+    depots = list(args.depots) + (read_depots(args.depots_file) if args.depots_file else [])
+    if not depots:
+        parser.error("no depots given")
+    overrides = {name: value for name, value in (("population_size", args.population),
+                                                 ("generations", args.generations)) if value is not None}
+    config = GAConfig.from_globals(**overrides)
+    jobs = [(args.engine, *depot[1:], None if args.seed is None else args.seed + k, config, args.days)
+            for k, depot in enumerate(depots)]
+    labels = day_labels(args.days)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        writer = WRITERS[args.format](out)
+        results = pool.map(solve_depot, *zip(*jobs)) if pool else (solve_depot(*job) for job in jobs)
+        files = save_names([depot[0] for depot in depots])
+        solved = zip(depots, results)
+        for k, ((name, num_buses, drivers_a, drivers_b), (weekly_schedule, driver_info)) in enumerate(solved):
+            for row in trip_rows(name, weekly_schedule, labels):
+                writer.write(row)
+            out.flush()
+            if args.save_dir:
+                os.makedirs(args.save_dir, exist_ok=True)
+                save_week(os.path.join(args.save_dir, files[k]),
+                          SolvedWeek(num_buses, drivers_a, drivers_b, weekly_schedule, driver_info,
+                                     assign_driver_b_schedule(drivers_b)))
+            if args.summary:
+                penalties = day_penalties(weekly_schedule, num_buses)
+                print(f"{name}: штраф по дням {penalties}, всего {sum(penalties)}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def replan_main(argv):
+    parser = argparse.ArgumentParser(prog="cli.py replan",
+                                     description="Перепланирование сохранённой недели под изменившийся парк")
+    parser.add_argument("input", help="неделя, сохранённая через --save-dir или storage (JSON или двоичный)")
+    parser.add_argument("fleet", type=parse_depot, metavar="BUSES:A:B", help="новый парк")
+    parser.add_argument("-o", "--output", required=True, help="куда сохранить результат (.json — JSON, иначе двоичный)")
+    parser.add_argument("--generations", type=int, default=20, help="поколения GA на изменённый день (0 — без GA)")
+    parser.add_argument("--time-limit", type=float, default=None, help="секунд GA на день")
+    parser.add_argument("--workers", type=int, default=1, help="дней, перепланируемых параллельно")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    week = open_week(args.input)
+    _, num_buses, drivers_a, drivers_b = args.fleet
+    replanned = replan_week(week, num_buses, drivers_a, drivers_b, args.generations, args.time_limit,
+                            workers=args.workers, seed=args.seed)
+    save_solved(args.output, replanned)
+    before, after = day_penalties(week.weekly_schedule, num_buses), day_penalties(replanned.weekly_schedule, num_buses)
+    print(f"штраф по дням под новый парк: до {before} (всего {sum(before)}), после {after} (всего {sum(after)})",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import heapq
+import random
+
+from genetic import (A_FIRST, A_LAST, CODE_A, CODE_B, DRIVER_TYPE_B, ROUTE_DURATION, ROUTE_VARIATION, SLOT_TIMES,
+                     TURNAROUND, WEEK_DAYS, assign_driver_b_schedule, day_seed, required_buses)
+from schedule import ScheduleBuilder
+
+# Двухэтапный решатель дня — быстрая альтернатива genetic_algorithm с той же сигнатурой.
+# Этап 1: расписание рейсов по 5-минутным отсчётам fitness_function: в отсчёте, где на линии меньше
+# LOAD_PEAK/LOAD_NORMAL автобусов, выпускаются рейсы на свободных автобусах. Водители здесь учитываются
+# только числом: рейс получает тип A или B, если водителей этого типа, занятых в этот момент, меньше,
+# чем их всего. Этап 2: конкретные водители назначаются разбиением интервалов — проход по рейсам в порядке
+# начала с кучами освобождения, O(n log n); благодаря подсчёту на этапе 1 водитель находится для каждого рейса.
+# Ограничения те же, что штрафует fitness_function: водители A только в 8:00-17:00 и по возможности
+# без рейсов после 12:00 (штраф за обед), водители B — только в свои рабочие дни и с 15-минутным
+# перерывом после каждого рейса (значит, не больше 2 часов подряд).
+
+LUNCH = 12 * 60  #рейс водителя A с началом после 12:00 — штраф за обед один раз на водителя
+
+
+def build_timetable(num_buses, num_drivers_a, num_drivers_b, is_weekend):
+    # этап 1: список (начало, конец, автобус, тип водителя) по возрастанию начала.
+    # До 12:00 рейсы в окне A отдаются водителям A, после — сначала B: у водителя A рейс после 12:00
+    # стоит штрафа за обед
+    required = required_buses(num_buses, is_weekend)
+    num_drivers_a = 0 if is_weekend else num_drivers_a
+    free_buses = list(range(1, num_buses + 1))  #куча номеров свободных автобусов
+    busy_buses = []  #куча (время освобождения, автобус)
+    running = []  #куча концов рейсов на линии
+    busy_a, busy_b = [], []  #кучи времён освобождения занятых водителей A и B
+    trips = []
+    for t, need in zip(SLOT_TIMES.tolist(), required.tolist()):
+        while busy_buses and busy_buses[0][0] <= t:
+            heapq.heappush(free_buses, heapq.heappop(busy_buses)[1])
+        for heap in (running, busy_a, busy_b):
+            while heap and heap[0] <= t:
+                heapq.heappop(heap)
+        while len(running) < need and free_buses:
+            end = t + ROUTE_DURATION + random.randint(-ROUTE_VARIATION, ROUTE_VARIATION)
+            a_free = len(busy_a) < num_drivers_a and A_FIRST <= t and end <= A_LAST
+            b_free = len(busy_b) < num_drivers_b
+            if a_free and (t < LUNCH or not b_free):
+                driver_type = CODE_A
+                heapq.heappush(busy_a, end)
+            elif b_free:
+                driver_type = CODE_B
+                heapq.heappush(busy_b, end + TURNAROUND)
+            else:
+                break
+            bus = heapq.heappop(free_buses)
+            heapq.heappush(busy_buses, (end + TURNAROUND, bus))
+            heapq.heappush(running, end)
+            trips.append((t, end, bus, driver_type))
+    return trips
+
+
+def assign_drivers(trips, num_drivers_a, working_b):
+    # этап 2: Schedule с водителями для рейсов этапа 1. Свободный водитель нужного типа есть всегда:
+    # рейсов одного типа одновременно не больше, чем водителей. Из свободных A для рейса после 12:00
+    # берётся тот, кто уже работал после 12:00 (штраф за обед у него уже есть)
+    busy_a, busy_b = [], []  #кучи (время освобождения, водитель)
+    fresh_a = list(range(num_drivers_a, 0, -1))  #свободные водители A без рейсов после 12:00; стек, pop() берёт вернувшегося последним
+    late_a, late = [], set()
+    free_b = [d for d in range(len(working_b), 0, -1) if working_b[d - 1]]
+    schedule = ScheduleBuilder()
+    for start, end, bus, driver_type in trips:
+        while busy_a and busy_a[0][0] <= start:
+            driver = heapq.heappop(busy_a)[1]
+            (late_a if driver in late else fresh_a).append(driver)
+        while busy_b and busy_b[0][0] <= start:
+            free_b.append(heapq.heappop(busy_b)[1])
+
+        if driver_type == CODE_A:
+            pool = late_a if start >= LUNCH and late_a or not fresh_a else fresh_a
+            if not pool:
+                continue
+            driver = pool.pop()
+            if start >= LUNCH:
+                late.add(driver)
+            heapq.heappush(busy_a, (end, driver))
+        else:
+            if not free_b:
+                continue
+            driver = free_b.pop()
+            heapq.heappush(busy_b, (end + TURNAROUND, driver))
+        schedule.add(bus, driver_type, driver, start, end)
+    return schedule.build()
+
+
+def decomposed_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
+    # те же аргументы и результат (Schedule дня), что у genetic_algorithm
+    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+    working_b = [WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i + 1}"] for i in range(num_drivers_b)]
+    trips = build_timetable(num_buses, num_drivers_a, sum(working_b), is_weekend)
+    return assign_drivers(trips, num_drivers_a, working_b)
+
+
+def solve_day(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, seed=None):
+    if seed is not None:
+        random.seed(day_seed(seed, day_index))
+    return decomposed_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
+
+
+def generate_weekly_schedule(num_buses, num_drivers_a, num_drivers_b, seed=None):
+    # неделя, как genetic.generate_weekly_schedule; день решается за миллисекунды, пул процессов не нужен
+    driver_b_schedule = assign_driver_b_schedule(num_drivers_b)
+    weekly_schedule = []
+    daily_driver_info = {day: set() for day in WEEK_DAYS}
+    for day_index, day in enumerate(WEEK_DAYS):
+        schedule = solve_day(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, seed)
+        weekly_schedule.append(schedule)
+        daily_driver_info[day].update(schedule.driver_ids())
+    return weekly_schedule, daily_driver_info
@@ -1,5 +1,18 @@
+import bisect
+import heapq
+import os
 import random
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from timeline import Timeline
+from schedule import DRIVER_TYPES, TYPE_CODES, Schedule, ScheduleBuilder, pack_schedules, unpack_schedules
+from vlob import schedule_day
 
 START_TIME = 6  # 6:00
 END_TIME = 27   # 3:00
@@ -11,6 +24,9 @@ ROUTE_VARIATION = 10
 
 DRIVER_TYPE_A = "A"
 DRIVER_TYPE_B = "B"
+CODE_A, CODE_B = TYPE_CODES[DRIVER_TYPE_A], TYPE_CODES[DRIVER_TYPE_B]
+A_FIRST, A_LAST = 8 * 60, 17 * 60  #рабочее окно водителей A
+TURNAROUND = 15  #перерыв автобуса между рейсами (и водителя B — в decomposed и routes)
 
 
 PEAK_HOURS = [(7, 9), (17, 19)]
@@ -39,259 +55,1077 @@ def format_time(delta):
    return base_time.strftime("%H:%M")
 
 def fitness_function(schedule, num_buses, is_weekend):
-   active_buses_count = {t: 0 for t in range(START_TIME * 60, END_TIME * 60 + 1, 5)} # t — это ключ (время в минутах, отслеживаем каждые 5 минкт с начала идо конца),
-                                                                                        # значение —количество автобусов, работающих в этот момент времени.
-   driver_assignments = {} #хранение всех рейсов для каждого водителя (их начало и конец) для отслеживания пересечения маршрутов для одного водителя.
-   penalty = 0
-   seen_trips = set()
-
-   #для отслеживания обедов водителей A
-   driver_lunch_taken = {driver: False for driver in driver_assignments}
-
-   for entry in schedule:
-       trip = (entry["bus"], entry["driver_id"], entry["start_time"], entry["end_time"])
-       #проверка на дублирование рейсов
-       if trip in seen_trips:
-           penalty += 100
-       else:
-           seen_trips.add(trip)
-
-       start_minutes = int(entry["start_time"].total_seconds() // 60)
-       end_minutes = int(entry["end_time"].total_seconds() // 60)
-
-       #проверяем часы работы водителя типа A
-       if entry["driver_type"] == DRIVER_TYPE_A:
-           if start_minutes < 8 * 60 or end_minutes > 17 * 60:
-               penalty += 10
-           #проверка на обеденный перерыв после 12:00
-           if start_minutes >= 12 * 60 and not driver_lunch_taken.get(entry["driver_id"], False):
-               penalty += 20  # Штраф за отсутствие обеда
-               driver_lunch_taken[entry["driver_id"]] = True
-
-       #проверяем пересечения рейсов для водителей
-       driver = entry["driver_id"]
-       if driver not in driver_assignments:
-           driver_assignments[driver] = []
-       for other_start, other_end in driver_assignments[driver]:
-           if not (end_minutes <= other_start or start_minutes >= other_end):
-               penalty += 5
-       driver_assignments[driver].append((start_minutes, end_minutes))
-
-       #проверяем количество автобусов на маршруте
-       for t in range(start_minutes, end_minutes, 5):
-           if t in active_buses_count:
-               active_buses_count[t] += 1
-
-   #штраф за отклонение от требуемого количества автобусов
-   for t, count in active_buses_count.items():
-       if is_peak_hour(timedelta(minutes=t), is_weekend):
-           required = int(num_buses * LOAD_PEAK)
-           if count < required:
-               penalty += (required - count) * 2
-       else:
-           required = int(num_buses * LOAD_NORMAL)
-           if count < required:
-               penalty += (required - count) * 2
-
-   # штраф за отсутствие 15-минутного перерыва у водителей B после 2 часов работы
-   for driver, trips in driver_assignments.items():
-       if driver.startswith(DRIVER_TYPE_B): #что водитель является водителем типа B
-           sorted_trips = sorted(trips, key=lambda x: x[0]) #сортируем рейсы водителя по времени начала
-           continuous_work = 0 #для отслеживания продолжительности непрерывной работы
-           last_end = None #для хранения времени завершения последнего рейса
-           for trip in sorted_trips:
-               if last_end is None: #если это первый рейс, вычисляем продолжительность работы
-                   continuous_work = trip[1] - trip[0]
+   # штрафы: дубли рейсов (100), рейсы водителей A вне 8:00-17:00 (10), нет обеда (20),
+   # пересечения рейсов одного водителя (5), нехватка автобусов на маршруте (2 за автобус),
+   # водители B без 15-минутного перерыва после 2 часов работы (10)
+   return int(fitness_batch([schedule], num_buses, is_weekend)[0])  # мы стремимся к меньшему штрафу
+
+
+# сетка 5-минутных отсчётов, по которой fitness_function считает покрытие
+SLOT_STEP = 5
+SLOT_TIMES = np.arange(START_TIME * 60, END_TIME * 60 + 1, SLOT_STEP)
+SLOT_IS_PEAK = np.array([any(start <= (t // 60) % 24 < end for start, end in PEAK_HOURS) for t in SLOT_TIMES])
+
+
+def required_buses(num_buses, is_weekend):
+    # норма активных автобусов в каждом отсчёте SLOT_TIMES, как в fitness_function
+    peak = SLOT_IS_PEAK if not is_weekend else np.zeros(len(SLOT_TIMES), dtype=bool)
+    return np.where(peak, int(num_buses * LOAD_PEAK), int(num_buses * LOAD_NORMAL))
+
+
+_TIME_KEY = 1 << 20  # множитель для составных ключей (группа, время)
+
+
+def pack_population(population):
+    # склеиваем столбцы всех расписаний популяции: одна позиция — один рейс
+    population = [Schedule.from_records(schedule) for schedule in population]
+    merged = Schedule.concatenate(population)
+    driver_type = merged.driver_type.astype(np.int64)
+    driver = merged.driver.astype(np.int64)
+    return {
+        "size": len(population),
+        "ind": np.repeat(np.arange(len(population)), [len(schedule) for schedule in population]),
+        "bus": merged.bus.astype(np.int64),
+        "driver": driver * len(DRIVER_TYPES) + driver_type,
+        "start": merged.start.astype(np.int64),
+        "end": merged.end.astype(np.int64),
+        "is_a": driver_type == TYPE_CODES[DRIVER_TYPE_A],
+        "is_b": driver_type == TYPE_CODES[DRIVER_TYPE_B],
+    }
+
+
+def _coverage_penalty(packed, num_buses, is_weekend):
+    size = packed["size"]
+    start, end, ind = packed["start"], packed["end"], packed["ind"]
+    n_slots = len(SLOT_TIMES)
+    first = SLOT_TIMES[0]
+
+    # рейс занимает отсчёты start, start+5, ... < end, и только если они попадают на сетку
+    on_grid = (start - first) % SLOT_STEP == 0
+    lo = np.maximum(start - first, 0) // SLOT_STEP
+    hi = np.minimum((end - first + SLOT_STEP - 1) // SLOT_STEP, n_slots)
+    hi = np.maximum(hi, 0)
+    valid = on_grid & (lo < hi)
+
+    #разностный массив по отсчётам, затем накопленная сумма даёт число автобусов
+    width = n_slots + 1
+    diff = np.bincount(ind[valid] * width + lo[valid], minlength=size * width)
+    diff -= np.bincount(ind[valid] * width + hi[valid], minlength=size * width)
+    counts = np.cumsum(diff.reshape(size, width), axis=1)[:, :n_slots]
+
+    peak = SLOT_IS_PEAK if not is_weekend else np.zeros(n_slots, dtype=bool)
+    required = np.where(peak, int(num_buses * LOAD_PEAK), int(num_buses * LOAD_NORMAL))
+    return (np.maximum(required - counts, 0).sum(axis=1) * 2).astype(np.int64)
+
+
+def _driver_terms_batch(packed):
+    # штрафы, зависящие от водителя, считаем по группам (расписание, водитель);
+    # возвращаем номер расписания группы, код водителя и матрицу штрафов по правилам DRIVER_RULES
+    ind, bus, driver = packed["ind"], packed["bus"], packed["driver"]
+    start, end, is_a, is_b = packed["start"], packed["end"], packed["is_a"], packed["is_b"]
+    n = len(ind)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((len(DRIVER_RULES), 0), dtype=np.int64)
+
+    group_key = ind * (driver.max() + 1) + driver
+    #сортировка по (группа, начало, порядок в расписании) — как sorted() в старой fitness_function
+    order = np.lexsort((np.arange(n), start, group_key))
+    g, s, e = group_key[order], start[order], end[order]
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = g[1:] != g[:-1]
+    group_first = np.flatnonzero(new_group)
+    group_id = np.cumsum(new_group) - 1
+    rank = np.arange(n) - group_first[group_id]
+    n_groups = len(group_first)
+    trip_group = np.empty(n, dtype=np.int64)
+    trip_group[order] = group_id
+    terms = np.zeros((len(DRIVER_RULES), n_groups), dtype=np.int64)
+
+    #дубли: одинаковые (автобус, водитель, начало, конец) внутри расписания
+    dup_order = np.lexsort((end, start, bus, group_key))
+    keys = np.stack([group_key, bus, start, end])[:, dup_order]
+    duplicates = np.zeros(n, dtype=bool)
+    duplicates[1:] = (keys[:, 1:] == keys[:, :-1]).all(axis=0)
+    terms[0] = np.bincount(trip_group[dup_order][duplicates], minlength=n_groups) * 100
+
+    #часы работы водителей A
+    terms[1] = np.bincount(trip_group[is_a & ((start < 8 * 60) | (end > 17 * 60))], minlength=n_groups) * 10
+
+    #обед: один штраф на водителя A, у которого есть рейс после 12:00
+    terms[2] = (np.bincount(trip_group[is_a & (start >= 12 * 60)], minlength=n_groups) > 0) * 20
+
+    #пересечения: для каждого рейса считаем более ранние рейсы той же группы, которые ещё не закончились
+    ends_sorted = np.sort(g * _TIME_KEY + e)
+    finished = np.searchsorted(ends_sorted, g * _TIME_KEY + s, side="right") - group_first[group_id]
+    terms[3] = np.bincount(group_id, weights=rank - finished, minlength=n_groups).astype(np.int64) * 5
+
+    #перерывы водителей B: проходим рейсы по рангу внутри группы, все группы сразу
+    b_trips = np.flatnonzero(is_b[order])
+    b_trips = b_trips[np.argsort(rank[b_trips], kind="stable")]
+    bounds = np.searchsorted(rank[b_trips], np.arange(int(rank[b_trips].max()) + 2 if b_trips.size else 0))
+    continuous_work = np.zeros(n_groups, dtype=np.int64)
+    last_end = np.zeros(n_groups, dtype=np.int64)
+    for k in range(len(bounds) - 1):
+        sel = b_trips[bounds[k]:bounds[k + 1]]
+        gid, duration = group_id[sel], e[sel] - s[sel]
+        if k == 0:
+            work = duration
+        else:
+            work = np.where(s[sel] - last_end[gid] >= 15, duration, continuous_work[gid] + duration)
+        over = work > 120
+        terms[4, gid[over]] += 10
+        continuous_work[gid] = np.where(over, 0, work)
+        last_end[gid] = e[sel]
+
+    return ind[order][group_first], driver[order][group_first], terms
+
+
+def _driver_terms(schedule, code):
+    # те же штрафы для одного водителя одного расписания — O(число его рейсов)
+    idx = np.flatnonzero(schedule.driver.astype(np.int64) * len(DRIVER_TYPES) + schedule.driver_type == code)
+    if not idx.size:
+        return None
+    start, end, bus = schedule.start[idx].tolist(), schedule.end[idx].tolist(), schedule.bus[idx].tolist()
+    is_a = code % len(DRIVER_TYPES) == TYPE_CODES[DRIVER_TYPE_A]
+    is_b = code % len(DRIVER_TYPES) == TYPE_CODES[DRIVER_TYPE_B]
+
+    duplicates = (len(idx) - len(set(zip(bus, start, end)))) * 100
+    hours = sum(10 for s, e in zip(start, end) if s < 8 * 60 or e > 17 * 60) if is_a else 0
+    lunch = 20 if is_a and max(start) >= 12 * 60 else 0
+
+    trips = sorted(zip(start, end), key=lambda x: x[0])
+    overlaps = 0
+    for j, (s, _) in enumerate(trips):
+        overlaps += sum(1 for _, e in trips[:j] if e > s) * 5
+
+    breaks = 0
+    if is_b:
+        continuous_work, last_end = 0, None
+        for s, e in trips:
+            if last_end is None or s - last_end >= 15:
+                continuous_work = e - s
+            else:
+                continuous_work += e - s
+            if continuous_work > 120:
+                breaks += 10
+                continuous_work = 0
+            last_end = e
+    return duplicates, hours, lunch, overlaps, breaks
+
+
+def driver_codes(schedule):
+    return schedule.driver.astype(np.int64) * len(DRIVER_TYPES) + schedule.driver_type
+
+
+DRIVER_RULES = ("duplicates", "type_a_hours", "lunch", "overlaps", "b_breaks")
+
+
+class PenaltyBreakdown:
+    # штраф расписания по составляющим: покрытие + штрафы каждого водителя по правилам DRIVER_RULES.
+    # После скрещивания часть слагаемых может быть ещё не посчитана: coverage = None и/или
+    # коды водителей в pending; их досчитывает resolve_penalties сразу для всей популяции
+    __slots__ = ("coverage", "drivers", "pending", "num_buses", "is_weekend", "total")
+
+    def __init__(self, coverage, drivers, num_buses, is_weekend, pending=frozenset()):
+        self.coverage = coverage
+        self.drivers = drivers  # код водителя -> кортеж штрафов
+        self.pending = frozenset(pending)
+        self.num_buses = num_buses
+        self.is_weekend = is_weekend
+        self.total = coverage + sum(sum(terms) for terms in drivers.values()) if self.complete else None
+
+    @property
+    def complete(self):
+        return self.coverage is not None and not self.pending
+
+    def matches(self, num_buses, is_weekend):
+        return self.num_buses == num_buses and self.is_weekend == is_weekend
+
+    def with_drivers(self, schedule, codes):
+        # пересчитываем только указанных водителей, остальные слагаемые берём как есть
+        drivers = {code: terms for code, terms in self.drivers.items() if code not in codes}
+        if not self.complete:
+            return PenaltyBreakdown(self.coverage, drivers, self.num_buses, self.is_weekend, self.pending | set(codes))
+        for code in codes:
+            terms = _driver_terms(schedule, code)
+            if terms is not None:
+                drivers[code] = terms
+        return PenaltyBreakdown(self.coverage, drivers, self.num_buses, self.is_weekend)
+
+    def by_rule(self):
+        rules = dict(zip(DRIVER_RULES, map(sum, zip(*self.drivers.values())))) if self.drivers else {}
+        rules = {rule: int(rules.get(rule, 0)) for rule in DRIVER_RULES}
+        rules["coverage"] = int(self.coverage)
+        return rules
+
+
+def resolve_penalties(population, evaluator=None):
+    # досчитываем недостающие слагаемые у всех расписаний одним пакетом:
+    # покрытие целиком, водительские штрафы — только по рейсам водителей из pending.
+    # evaluator (ParallelEvaluator) считает этот пакет в своём пуле процессов
+    todo = [schedule for schedule in population if schedule.penalty is not None and not schedule.penalty.complete]
+    if not todo:
+        return
+    subsets = [schedule[np.isin(driver_codes(schedule), list(schedule.penalty.pending))] for schedule in todo]
+    if evaluator is not None:
+        group_ind, group_code, terms = evaluator.driver_terms(subsets)
+    else:
+        group_ind, group_code, terms = _driver_terms_batch(pack_population(subsets))
+    fresh = [{} for _ in todo]
+    for k, code, column in zip(group_ind.tolist(), group_code.tolist(), terms.T.tolist()):
+        fresh[k][code] = tuple(column)
+    need_coverage = [k for k, schedule in enumerate(todo) if schedule.penalty.coverage is None]
+    coverage = {}
+    for params in {(todo[k].penalty.num_buses, todo[k].penalty.is_weekend) for k in need_coverage}:
+        group = [k for k in need_coverage if (todo[k].penalty.num_buses, todo[k].penalty.is_weekend) == params]
+        schedules = [todo[k] for k in group]
+        if evaluator is not None and evaluator.matches(*params):
+            values = evaluator.coverage(schedules)
+        else:
+            values = _coverage_penalty(pack_population(schedules), *params)
+        coverage.update(zip(group, values.tolist()))
+    for k, schedule in enumerate(todo):
+        penalty = schedule.penalty
+        drivers = dict(penalty.drivers)
+        drivers.update(fresh[k])
+        schedule.penalty = PenaltyBreakdown(coverage.get(k, penalty.coverage), drivers, penalty.num_buses,
+                                            penalty.is_weekend)
+
+
+def _breakdown_arrays(population, num_buses, is_weekend):
+    packed = pack_population(population)
+    return (_coverage_penalty(packed, num_buses, is_weekend),) + _driver_terms_batch(packed)
+
+
+def _assemble_breakdowns(size, arrays, num_buses, is_weekend):
+    coverage, group_ind, group_code, terms = arrays
+    drivers = [{} for _ in range(size)]
+    for k, code, column in zip(group_ind.tolist(), group_code.tolist(), terms.T.tolist()):
+        drivers[k][code] = tuple(column)
+    return [PenaltyBreakdown(int(c), d, num_buses, is_weekend) for c, d in zip(coverage, drivers)]
+
+
+def penalty_breakdowns(population, num_buses, is_weekend):
+    return _assemble_breakdowns(len(population), _breakdown_arrays(population, num_buses, is_weekend),
+                                num_buses, is_weekend)
+
+
+# параметры дня, переданные процессу пула один раз при его запуске
+_worker_day = None
+
+
+def _init_worker(num_buses, is_weekend):
+    global _worker_day
+    _worker_day = (num_buses, is_weekend)
+
+
+def _worker_breakdowns(lengths, matrix):
+    arrays = _breakdown_arrays(unpack_schedules(lengths, matrix), *_worker_day)
+    return tuple(np.asarray(a) for a in arrays)
+
+
+def _worker_coverage(lengths, matrix):
+    return np.asarray(_coverage_penalty(pack_population(unpack_schedules(lengths, matrix)), *_worker_day))
+
+
+def _worker_driver_terms(lengths, matrix):
+    return tuple(np.asarray(a) for a in _driver_terms_batch(pack_population(unpack_schedules(lengths, matrix))))
+
+
+class ParallelEvaluator:
+    # постоянный пул процессов для оценки популяции одного дня: полные оценки (breakdowns) и досчёт
+    # покрытия и водительских штрафов детей в каждом поколении (coverage, driver_terms — см. resolve_penalties);
+    # небольшие пакеты считаются в текущем процессе — накладные расходы там больше выигрыша
+    def __init__(self, num_buses, is_weekend, workers=None, min_parallel_trips=20000):
+        self.num_buses = num_buses
+        self.is_weekend = is_weekend
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_trips = min_parallel_trips
+        self.evaluations = 0
+        self.resolved = 0
+        self.seconds = 0.0
+        self._pool = None
+
+    def matches(self, num_buses, is_weekend):
+        return self.num_buses == num_buses and self.is_weekend == is_weekend
+
+    def _parallel(self, population):
+        trips = sum(len(schedule) for schedule in population)
+        return self.workers > 1 and len(population) >= 2 and trips >= self.min_parallel_trips
+
+    def _map(self, worker, population):
+        # куски популяции по числу процессов; результаты возвращаются по кускам в исходном порядке
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.num_buses, self.is_weekend))
+        chunks = np.array_split(np.arange(len(population)), min(self.workers, len(population)))
+        futures = [self._pool.submit(worker, *pack_schedules([population[k] for k in chunk])) for chunk in chunks]
+        return chunks, [future.result() for future in futures]
+
+    def breakdowns(self, population):
+        started = time.perf_counter()
+        if not self._parallel(population):
+            result = penalty_breakdowns(population, self.num_buses, self.is_weekend)
+        else:
+            result = []
+            for chunk, arrays in zip(*self._map(_worker_breakdowns, population)):
+                result.extend(_assemble_breakdowns(len(chunk), arrays, self.num_buses, self.is_weekend))
+        self.evaluations += len(population)
+        self.seconds += time.perf_counter() - started
+        return result
+
+    def coverage(self, population):
+        started = time.perf_counter()
+        if not self._parallel(population):
+            result = _coverage_penalty(pack_population(population), self.num_buses, self.is_weekend)
+        else:
+            result = np.concatenate(self._map(_worker_coverage, population)[1])
+        self.resolved += len(population)
+        self.seconds += time.perf_counter() - started
+        return result
+
+    def driver_terms(self, population):
+        # то же, что _driver_terms_batch: номера расписаний в ответах процессов сдвигаем на начало куска
+        started = time.perf_counter()
+        if not self._parallel(population):
+            result = _driver_terms_batch(pack_population(population))
+        else:
+            chunks, parts = self._map(_worker_driver_terms, population)
+            result = (np.concatenate([ind + chunk[0] for chunk, (ind, _, _) in zip(chunks, parts)]),
+                      np.concatenate([code for _, code, _ in parts]),
+                      np.concatenate([terms for _, _, terms in parts], axis=1))
+        self.seconds += time.perf_counter() - started
+        return result
+
+    def stats(self):
+        done = self.evaluations + self.resolved
+        return {"evaluations": self.evaluations, "resolved": self.resolved, "seconds": self.seconds,
+                "evaluations_per_second": done / self.seconds if self.seconds else 0.0}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fitness_batch(population, num_buses, is_weekend):
+    # те же штрафы, что и в fitness_function, но для всей популяции за один вызов
+    packed = pack_population(population)
+    group_ind, _, terms = _driver_terms_batch(packed)
+    penalty = _coverage_penalty(packed, num_buses, is_weekend)
+    penalty += np.bincount(group_ind, weights=terms.sum(axis=0), minlength=len(population)).astype(np.int64)
+    return -penalty
+
+
+class FitnessCache:
+    # оценка популяции со счётчиками: misses — полные оценки, incremental — досчёт слагаемых после
+    # скрещивания/мутации (resolve_penalties), reused — расписания с уже известным штрафом, hits — попадания
+    # в LRU-кэш по отпечатку содержимого. Дети несут свой PenaltyBreakdown, поэтому в прогоне GA кэш
+    # почти не попадает и по умолчанию выключен (maxsize=0) вместе с подсчётом отпечатков
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self.reused = 0
+        self._entries = OrderedDict()
+
+    def key(self, schedule, num_buses, is_weekend):
+        if not self.maxsize:
+            return id(schedule), num_buses, is_weekend  #без кэша: одинаковые только сами объекты
+        return schedule.fingerprint(), num_buses, is_weekend
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.incremental = self.reused = 0
+
+    def evaluate(self, population, num_buses, is_weekend, evaluator=None):
+        # то же, что fitness_batch, но считаем только расписания без известного штрафа;
+        # каждому расписанию прикрепляется его PenaltyBreakdown. evaluator (ParallelEvaluator)
+        # считает в пуле процессов и промахи кэша, и досчёт слагаемых у детей
+        scores = np.zeros(len(population), dtype=np.int64)
+        missing = {}
+        known = [s for s in population if s.penalty is not None and s.penalty.matches(num_buses, is_weekend)]
+        pending = sum(not s.penalty.complete for s in known)
+        resolve_penalties(known, evaluator)
+        self.incremental += pending
+        self.reused += len(known) - pending
+        for k, schedule in enumerate(population):
+            if schedule.penalty is not None and schedule.penalty.matches(num_buses, is_weekend):
+                scores[k] = -schedule.penalty.total
+                continue
+            key = self.key(schedule, num_buses, is_weekend)
+            value = self.get(key)
+            if value is not None:
+                schedule.penalty = value
+                scores[k] = -value.total
+                self.hits += 1
+            elif key in missing:
+                missing[key].append(k)
+                self.hits += 1
+            else:
+                missing[key] = [k]
+                self.misses += 1
+        if missing:
+            schedules = [population[positions[0]] for positions in missing.values()]
+            if evaluator is not None and evaluator.matches(num_buses, is_weekend):
+                fresh = evaluator.breakdowns(schedules)
+            else:
+                fresh = penalty_breakdowns(schedules, num_buses, is_weekend)
+            for (key, positions), value in zip(missing.items(), fresh):
+                self.put(key, value)
+                for k in positions:
+                    population[k].penalty = value
+                scores[positions] = -value.total
+        return scores
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "incremental": self.incremental, "reused": self.reused,
+                "size": len(self._entries), "hit_rate": self.hits / total if total else 0.0}
+
+
+class _RandomStream:
+    # случайные величины берём пачками: биты «монетки» по 64 за раз и отклонения длительности рейса
+    def __init__(self, batch=256):
+        self.batch = batch
+        self._word = 0
+        self._left = 0
+        self._routes = []
+
+    def _refill(self):
+        self._word = random.getrandbits(64)
+        self._left = 64
+
+    def flip(self):
+        if not self._left:
+            self._refill()
+        bit = self._word & 1
+        self._word >>= 1
+        self._left -= 1
+        return bit
+
+    def failures(self):
+        # число «решек» до первого «орла» — геометрическое распределение
+        count = 0
+        while True:
+            if not self._left:
+                self._refill()
+            if not self._word:
+                count += self._left
+                self._left = 0
+                continue
+            zeros = (self._word & -self._word).bit_length() - 1
+            self._word >>= zeros + 1
+            self._left -= zeros + 1
+            return count + zeros
+
+    def route_time(self):
+        if not self._routes:
+            self._routes = random.choices(range(-ROUTE_VARIATION, ROUTE_VARIATION + 1), k=self.batch)
+        return ROUTE_DURATION + self._routes.pop()
+
+
+class _DriverPool:
+    # свободные водители: O(1) добавление, удаление и равновероятный выбор
+    def __init__(self):
+        self.items = []
+        self._pos = {}
+
+    def add(self, driver):
+        self._pos[driver] = len(self.items)
+        self.items.append(driver)
+
+    def remove(self, driver):
+        pos = self._pos.pop(driver)
+        last = self.items.pop()
+        if last != driver:
+            self.items[pos] = last
+            self._pos[last] = pos
+
+    def choice(self):
+        return self.items[random.randrange(len(self.items))]
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _build_individual(num_buses, num_drivers_a, num_drivers_b, is_weekend, working_b, stream):
+   # событийная версия 5-минутного цикла: время перескакивает к моменту, когда освобождается
+   # автобус или водитель, а свободные автобусы, которым не достанется водителя, пропускаются
+   schedule = ScheduleBuilder()
+   code_a, code_b = TYPE_CODES[DRIVER_TYPE_A], TYPE_CODES[DRIVER_TYPE_B]
+   first, step, day_end = START_TIME * 60, 5, END_TIME * 60
+
+   free_buses = list(range(num_buses))  #свободные автобусы по возрастанию номера
+   busy_buses = []  #куча (время освобождения, автобус)
+   busy_a = [(8 * 60, d) for d in range(num_drivers_a)] if not is_weekend else []
+   busy_b = [(0, d) for d in range(num_drivers_b) if working_b[d]]
+   heapq.heapify(busy_a)
+   heapq.heapify(busy_b)
+   pool_a, pool_b = _DriverPool(), _DriverPool()
+   lunch_taken = [False] * num_drivers_a
+   hungry = 0  #свободные водители A без обеда
+
+   current_time = first
+   while current_time < day_end:
+       while busy_buses and busy_buses[0][0] <= current_time:
+           bisect.insort(free_buses, heapq.heappop(busy_buses)[1])
+       while busy_a and busy_a[0][0] <= current_time:
+           driver = heapq.heappop(busy_a)[1]
+           pool_a.add(driver)
+           hungry += not lunch_taken[driver]
+       while busy_b and busy_b[0][0] <= current_time:
+           pool_b.add(heapq.heappop(busy_b)[1])
+
+       i = 0
+       while i < len(free_buses):
+           # водитель A может что-то сделать, если успевает закончить рейс до 17:00 или идёт на обед
+           a_useful = bool(pool_a) and (current_time + ROUTE_DURATION - ROUTE_VARIATION <= 17 * 60
+                                        or (current_time >= 12 * 60 and hungry > 0))
+           b_useful = bool(pool_b)
+           if a_useful and b_useful:
+               driver_type = DRIVER_TYPE_A if stream.flip() else DRIVER_TYPE_B
+           elif a_useful or b_useful:
+               #автобусы, которым выпал тип без свободных водителей, ничего не меняют
+               i += stream.failures()
+               if i >= len(free_buses):
+                   break
+               driver_type = DRIVER_TYPE_A if a_useful else DRIVER_TYPE_B
+           else:
+               break
+           bus = free_buses[i]
+
+           if driver_type == DRIVER_TYPE_A:
+               driver = pool_a.choice()
+               if current_time >= 12 * 60 and not lunch_taken[driver]:
+                   # Назначаем обед
+                   end_time = current_time + 60
+                   schedule.add(bus + 1, code_a, driver + 1, current_time, end_time)
+                   lunch_taken[driver] = True
+                   hungry -= 1
+                   pool_a.remove(driver)
+                   heapq.heappush(busy_a, (end_time + 60, driver))
                else:
-                   # если этот перерыв больше или равен 15 минутам, то работа считается прерванной, и continuous_work сбрасывается на длительность текущего рейса
-                   # если же перерыв меньше 15 минут, continuous_work увеличивается на продолжительность текущего рейса
-                   gap = trip[0] - last_end #время "перерыва" между рейсами
-                   if gap >= 15:
-                       # Перерыв
-                       continuous_work = trip[1] - trip[0]
-                   else:
-                       # Продолжение работы
-                       continuous_work += (trip[1] - trip[0])
-               if continuous_work > 120:  # больше 2 часов
-                   penalty += 10
-                   continuous_work = 0
-               last_end = trip[1]
-
-   return -penalty  # мы стремимся к меньшему штрафу (число меньшее без минуса)
-
-
-def create_initial_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
+                   end_time = current_time + stream.route_time()
+                   if end_time > 17 * 60:  #водитель A заканчивает не позже 17:00
+                       i += 1
+                       continue
+                   schedule.add(bus + 1, code_a, driver + 1, current_time, end_time)
+                   pool_a.remove(driver)
+                   hungry -= not lunch_taken[driver]
+                   heapq.heappush(busy_a, (end_time, driver))
+           else:
+               driver = pool_b.choice()
+               end_time = current_time + stream.route_time()
+               schedule.add(bus + 1, code_b, driver + 1, current_time, end_time)
+               pool_b.remove(driver)
+               heapq.heappush(busy_b, (end_time + 15, driver))
+
+           del free_buses[i]
+           heapq.heappush(busy_buses, (end_time + 15, bus))
+
+       #следующий момент, когда что-то может измениться: нужен свободный автобус и полезный водитель
+       a_useful = bool(pool_a) and (current_time + ROUTE_DURATION - ROUTE_VARIATION <= 17 * 60
+                                    or (current_time >= 12 * 60 and hungry > 0))
+       next_time = current_time + step
+       if not free_buses:
+           if not busy_buses:
+               break
+           next_time = max(next_time, busy_buses[0][0])
+       if not a_useful and not pool_b:
+           driver_events = [heap[0][0] for heap in (busy_a, busy_b) if heap]
+           if not driver_events:
+               break
+           next_time = max(next_time, min(driver_events))
+       current_time = first + -(-(next_time - first) // step) * step  #округляем вверх до 5-минутной сетки
+
+   return schedule.build()
+
+
+def create_initial_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, size=None,
+                              stop=None):
+   # stop() -> True прерывает построение (например, по сроку RunController); хотя бы одна особь строится всегда
    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+   working_b = [WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i + 1}"] for i in range(num_drivers_b)]
+   stream = _RandomStream()
    population = []
-
-   for i in range(POPULATION_SIZE):
-       schedule = []
-       current_time = timedelta(hours=START_TIME)
-       bus_next_free_time = [current_time] * num_buses
-       driver_next_free_time_a = [timedelta(hours=8)] * num_drivers_a if not is_weekend else []
-       driver_lunch_taken_a = [False] * num_drivers_a if not is_weekend else []
-       driver_next_free_time_b = [timedelta(hours=0)] * num_drivers_b
-
-       while current_time < timedelta(hours=END_TIME):
-           for bus in range(num_buses):
-               if bus_next_free_time[bus] <= current_time:
-                   driver_type = random.choice([DRIVER_TYPE_A, DRIVER_TYPE_B])
-
-                   if driver_type == DRIVER_TYPE_A:
-                       if is_weekend:
-                           continue  #тип A не работает в выходные
-
-                       available_drivers = [i for i, ft in enumerate(driver_next_free_time_a) if ft <= current_time]
-                       if not available_drivers:
-                           continue
-                       driver_num = random.choice(available_drivers)
-                       driver_id = f"{DRIVER_TYPE_A}{driver_num + 1}"
-                       # Проверка, не нужно ли водителю брать обед
-                       if current_time >= timedelta(hours=12) and not driver_lunch_taken_a[driver_num]:
-                           # Назначаем обед
-                           start_time = current_time
-                           end_time = current_time + timedelta(minutes=60)
-                           schedule.append({
-                               "bus": bus + 1,
-                               "driver_id": driver_id,
-                               "driver_type": driver_type,
-                               "start_time": start_time,
-                               "end_time": end_time,
-                           })
-                           driver_next_free_time_a[driver_num] = end_time + timedelta(minutes=60)
-                           driver_lunch_taken_a[driver_num] = True
-                           bus_next_free_time[bus] = end_time + timedelta(minutes=15)
-                           continue
-
-                   else:
-                       available_drivers = [i for i, ft in enumerate(driver_next_free_time_b) if ft <= current_time]
-                       driver_candidates = [i for i in available_drivers if WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i + 1}"]]
-                       if not driver_candidates:
-                           continue
-                       driver_num = random.choice(driver_candidates)
-                       driver_id = f"{DRIVER_TYPE_B}{driver_num + 1}"
-
-
-                   route_time = ROUTE_DURATION + random.randint(-ROUTE_VARIATION, ROUTE_VARIATION)
-                   start_time = current_time
-                   end_time = current_time + timedelta(minutes=route_time)
-
-                   # для водителя A, не допускаем конец рейса позже 17:00
-                   if driver_type == DRIVER_TYPE_A and end_time > timedelta(hours=17):
-                       continue
-
-                   # если хотя бы один рейс в расписании пересекается
-                   if any(s["driver_id"] == driver_id and not (
-                           s["end_time"] <= start_time or s["start_time"] >= end_time) for s in schedule):
-                       continue
-
-                   # Создаем запись в расписании
-                   schedule.append({
-                       "bus": bus + 1,
-                       "driver_id": driver_id,
-                       "driver_type": driver_type,
-                       "start_time": start_time,
-                       "end_time": end_time,
-                   })
-
-
-                   bus_next_free_time[bus] = end_time + timedelta(minutes=15)
-
-
-                   if driver_type == DRIVER_TYPE_A:
-                       driver_next_free_time_a[driver_num] = end_time
-                   else:
-                       driver_next_free_time_b[driver_num] = end_time + timedelta(minutes=15)
-
-           #обновляем текущее время с шагом в 5 минут
-           current_time += timedelta(minutes=5)
-       population.append(schedule)
-
+   for _ in range(POPULATION_SIZE if size is None else size):
+       if population and stop is not None and stop():
+           break
+       population.append(_build_individual(num_buses, num_drivers_a, num_drivers_b, is_weekend, working_b, stream))
    return population
 
-def crossover(parent1, parent2):
-    if random.random() < CROSSING_RATE:
+def crossover(parent1, parent2, rate=None, num_buses=None):
+    if random.random() < (CROSSING_RATE if rate is None else rate):
         if len(parent1) == 0 or len(parent2) == 0:
             return parent1.copy(), parent2.copy()
         point1 = random.randint(0, len(parent1) - 1)
         point2 = random.randint(0, len(parent2) - 1)
         child1 = parent1[:point1] + parent2[point2:]
         child2 = parent2[:point2] + parent1[point1:]
+        _inherit_penalty(child1, parent1, point1, parent2, point2)
+        _inherit_penalty(child2, parent2, point2, parent1, point1)
         return child1, child2
     else:
         return parent1.copy(), parent2.copy()
 
 
-def mutate(schedule, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
-   if random.random() < MUTATION_RATE:
-       if not schedule:
+def _inherit_penalty(child, first, point1, second, point2):
+    # child = first[:point1] + second[point2:]; слагаемые водителей, чьи рейсы целиком пришли
+    # из одного родителя, переносим без пересчёта, остальных (и покрытие) помечаем для пересчёта
+    if first.penalty is None or second.penalty is None:
+        return
+    num_buses, is_weekend = first.penalty.num_buses, first.penalty.is_weekend
+    if not second.penalty.matches(num_buses, is_weekend):
+        return
+    codes1, codes2 = driver_codes(first), driver_codes(second)
+    head, tail = set(codes1[:point1].tolist()), set(codes2[point2:].tolist())
+    split = (head & set(codes1[point1:].tolist())) | (tail & set(codes2[:point2].tolist())) | (head & tail)
+    split |= (head & first.penalty.pending) | (tail & second.penalty.pending)
+    drivers = {code: first.penalty.drivers[code] for code in head - split}
+    drivers.update({code: second.penalty.drivers[code] for code in tail - split})
+    child.penalty = PenaltyBreakdown(None, drivers, num_buses, is_weekend, pending=split)
+
+
+def mutate(schedule, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, rate=None):
+   if random.random() < (MUTATION_RATE if rate is None else rate):
+       if not len(schedule):
            return schedule
-       entry = random.choice(schedule) #выбираем случ. один рейс
-       driver_type = entry["driver_type"]
+       k = random.randrange(len(schedule)) #выбираем случ. один рейс
+       driver_type = DRIVER_TYPES[schedule.driver_type[k]]
 
        if driver_type == DRIVER_TYPE_A:
            available_drivers = list(range(1, num_drivers_a + 1))
            driver_num = random.choice(available_drivers)
-           driver_id = f"{DRIVER_TYPE_A}{driver_num}"
        else:
            available_drivers = [i for i in range(1, num_drivers_b + 1) if
                                 WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i}"]] #можем выбрать В работающего только в этот день
            if not available_drivers:
                return schedule
            driver_num = random.choice(available_drivers)
-           driver_id = f"{DRIVER_TYPE_B}{driver_num}"
 
-       start_time = entry["start_time"]
-       end_time = entry["end_time"]
-       if any(s["driver_id"] == driver_id and not (s["end_time"] <= start_time or s["start_time"] >= end_time) for s in
-              schedule): #не занят ли выбранный водитель другим рейсом
+       start_time = schedule.start[k]
+       end_time = schedule.end[k]
+       busy = ((schedule.driver_type == schedule.driver_type[k]) & (schedule.driver == driver_num)
+               & (schedule.end > start_time) & (schedule.start < end_time))
+       if busy.any(): #не занят ли выбранный водитель другим рейсом
            return schedule
 
-       #меняем водителя
-       entry["driver_id"] = driver_id
+       _set_driver(schedule, k, driver_num)
 
    return schedule
 
-def genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
-   population = create_initial_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
-
-   for generation in range(GENERATIONS):
-       population = sorted(population,
-                           key=lambda s: fitness_function(s, num_buses, WEEK_DAYS[day_index] in ["СБ", "ВС"]),
-                           reverse=True) #сортируем популяции по фитнесу
-
-       #выбираем лучшую половину популяции
-       next_generation = population[:POPULATION_SIZE // 2]
-
-
-       while len(next_generation) < POPULATION_SIZE:
-           if len(next_generation) < 2:
-               parents = next_generation.copy()
-           else:
-               parents = random.sample(next_generation, 2)
-           parent1, parent2 = parents if len(parents) == 2 else (parents[0], parents[0])
-           child1, child2 = crossover(parent1, parent2)
-           child1 = mutate(child1, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
-           child2 = mutate(child2, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
-           next_generation.extend([child1, child2]) #добавляем в конец списка
-
-       population = next_generation[:POPULATION_SIZE]
 
-   #выбираем лучшее расписания по фитнесу
-   best_schedule = max(population, key=lambda s: fitness_function(s, num_buses, WEEK_DAYS[day_index] in ["СБ", "ВС"]))
-   return best_schedule
+def _set_driver(schedule, k, driver_num):
+    #меняем водителя; покрытие от водителя не зависит, пересчитываем только старого и нового
+    penalty = schedule.penalty
+    old_code = int(driver_codes(schedule[k:k + 1])[0])
+    schedule.driver[k] = driver_num
+    schedule.changed()
+    if penalty is not None:
+        schedule.penalty = penalty.with_drivers(schedule, {old_code, int(driver_codes(schedule[k:k + 1])[0])})
+
+
+def reassign_free_driver(schedule, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, rate=None):
+    # как mutate, но новый водитель выбирается только среди тех, кто свободен на время рейса,
+    # поэтому мутация не создаёт пересечений и не пропадает впустую
+    if random.random() < (MUTATION_RATE if rate is None else rate):
+        if not len(schedule):
+            return schedule
+        k = random.randrange(len(schedule))
+        if DRIVER_TYPES[schedule.driver_type[k]] == DRIVER_TYPE_A:
+            candidates = np.arange(1, num_drivers_a + 1)
+        else:
+            candidates = np.array([i for i in range(1, num_drivers_b + 1)
+                                   if WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i}"]], dtype=int)
+        busy = ((schedule.driver_type == schedule.driver_type[k]) & (schedule.end > schedule.start[k])
+                & (schedule.start < schedule.end[k]))
+        candidates = np.setdiff1d(candidates, schedule.driver[busy])  #сам текущий водитель тоже занят
+        if candidates.size:
+            _set_driver(schedule, k, int(random.choice(candidates)))
+    return schedule
+
+
+def repair(schedule, num_buses=None, drivers=None):
+    # делает расписание допустимым: убирает дубли рейсов, переносит рейс на свободный автобус,
+    # если его автобус занят (с перерывом 15 минут), и на свободного водителя, если занят его водитель
+    # (A — только в окне 8:00-17:00, у B перерыв 15 минут). Рейс, для которого замены нет, сдвигается
+    # на ближайший отсчёт сетки, когда освобождаются автобус и водитель, и удаляется, только если
+    # до конца дня такого момента нет — так стык после скрещивания не теряет покрытие.
+    # num_buses — размер парка (по умолчанию наибольший номер автобуса в расписании);
+    # drivers — коды водителей (driver_codes), которых можно назначать; по умолчанию — водители расписания
+    if not len(schedule):
+        return schedule.copy()
+    codes = driver_codes(schedule)
+    pool = np.unique(codes if drivers is None else drivers).tolist()
+    num_buses = int(schedule.bus.max()) if num_buses is None else num_buses
+    code_a = TYPE_CODES[DRIVER_TYPE_A]
+    width = len(DRIVER_TYPES)
+
+    trips = np.stack([schedule.start, schedule.end, schedule.bus, codes]).T.astype(np.int64)
+    trips = np.unique(trips, axis=0).tolist()  #без дублей и по возрастанию начала — уже куча
+    #рейсы берутся по возрастанию начала, поэтому автобус или водитель свободен, если его последний
+    #принятый рейс закончился (с перерывом) к началу текущего
+    bus_free, driver_free = {}, {}  # автобус / код водителя -> время, с которого он свободен
+    first, last = SLOT_TIMES[0], SLOT_TIMES[-1]
+    result = ScheduleBuilder()
+    while trips:
+        start, end, bus, code = heapq.heappop(trips)
+        free_bus = bus if bus_free.get(bus, start) <= start else \
+            next((b for b in range(1, num_buses + 1) if bus_free.get(b, start) <= start), None)
+        driver = code
+        a_allowed = 8 * 60 <= start and end <= 17 * 60
+        #окно A проверяется и для своего водителя: рейс мог прийти сдвинутым или уже вне окна
+        if driver_free.get(code, start) > start or not (a_allowed or code % width != code_a):
+            shift = random.randrange(len(pool))
+            candidates = [c for c in pool[shift:] + pool[:shift] if driver_free.get(c, start) <= start
+                          and (a_allowed or c % width != code_a)]
+            driver = next((c for c in candidates if c % width == code % width),
+                          candidates[0] if candidates else None)
+        if free_bus is None or driver is None:
+            #ближайший отсчёт, когда освободятся какой-нибудь автобус и какой-нибудь водитель
+            later = max(min(bus_free.get(b, 0) for b in range(1, num_buses + 1)),
+                        min(driver_free.get(c, 0) for c in pool), start + SLOT_STEP)
+            later = first + -(-(later - first) // SLOT_STEP) * SLOT_STEP
+            if later <= last:
+                heapq.heappush(trips, [later, end + later - start, bus, code])
+            continue
+        bus, code = free_bus, driver
+        bus_free[bus] = end + 15
+        driver_free[code] = end + (0 if code % width == code_a else 15)
+        result.add(bus, code % width, code // width, start, end)
+    return result.build()
+
+
+def time_aligned_crossover(parent1, parent2, rate=None, num_buses=None):
+    # оба родителя режутся в один и тот же момент времени: ребёнок берёт рейсы одного родителя,
+    # начавшиеся до разреза, и рейсы другого — после; стык чинится repair на водителях обоих родителей
+    if random.random() < (CROSSING_RATE if rate is None else rate):
+        if len(parent1) == 0 or len(parent2) == 0:
+            return parent1.copy(), parent2.copy()
+        first = min(int(parent1.start.min()), int(parent2.start.min()))
+        last = max(int(parent1.start.max()), int(parent2.start.max()))
+        cut = random.randint(first, last)
+        drivers = np.union1d(driver_codes(parent1), driver_codes(parent2))
+        head1, head2 = parent1.start < cut, parent2.start < cut
+        child1 = repair(parent1[head1] + parent2[~head2], num_buses, drivers)
+        child2 = repair(parent2[head2] + parent1[~head1], num_buses, drivers)
+        return child1, child2
+    else:
+        return parent1.copy(), parent2.copy()
 
-def generate_weekly_schedule(num_buses, num_drivers_a, num_drivers_b):
+class RunController:
+    # управление прогоном GA: ограничение по времени, остановка при стагнации или по достижении
+    # целевого штрафа, колбэк прогресса; лучшее расписание доступно в любой момент через best
+    def __init__(self, max_generations=None, time_limit=None, deadline=None, stagnation=None, target_penalty=None,
+                 progress=None):
+        if max_generations is None and time_limit is None and deadline is None and stagnation is None \
+                and target_penalty is None:
+            raise ValueError("RunController needs at least one stopping criterion")
+        self.max_generations = max_generations
+        self.time_limit = time_limit  # секунды от начала прогона
+        self.deadline = deadline  # абсолютное время, time.time()
+        self.stagnation = stagnation  # поколений без улучшения
+        self.target_penalty = target_penalty
+        self.progress = progress
+        self.best = None
+        self.best_fitness = None
+        self.generation = 0
+        self.stop_reason = None
+        self.started = None
+        self._last_improvement = 0
+        self._cancelled = False
+
+    def start(self):
+        self.started = time.time()
+        if self.time_limit is not None:
+            limit = self.started + self.time_limit
+            self.deadline = limit if self.deadline is None else min(self.deadline, limit)
+
+    def elapsed(self):
+        return time.time() - self.started if self.started is not None else 0.0
+
+    def cancel(self):
+        # можно вызвать из другого потока; прогон остановится после текущего поколения
+        self._cancelled = True
+
+    def expired(self):
+        # срок вышел или прогон отменён — проверяется и во время построения начальной популяции
+        return self._cancelled or self.deadline is not None and time.time() >= self.deadline
+
+    def update(self, generation, population, scores):
+        # вызывается после оценки каждого поколения; возвращает False, когда пора остановиться
+        if self.started is None:
+            self.start()
+        self.generation = generation + 1
+        best = int(np.argmax(scores))
+        if self.best_fitness is None or scores[best] > self.best_fitness:
+            self.best_fitness = int(scores[best])
+            self.best = population[best].copy()
+            self._last_improvement = generation
+        if self.progress is not None:
+            self.progress(self)
+
+        if self._cancelled:
+            self.stop_reason = "cancelled"
+        elif self.target_penalty is not None and -self.best_fitness <= self.target_penalty:
+            self.stop_reason = "target"
+        elif self.stagnation is not None and generation - self._last_improvement >= self.stagnation:
+            self.stop_reason = "stagnation"
+        elif self.deadline is not None and time.time() >= self.deadline:
+            self.stop_reason = "deadline"
+        elif self.max_generations is not None and self.generation >= self.max_generations:
+            self.stop_reason = "generations"
+        return self.stop_reason is None
+
+
+def warm_start_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, size,
+                          perturbation=0.05):
+    # жадное расписание vlob с учётом спроса + его копии, где у части рейсов сменён водитель
+    working_b = [WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{i + 1}"] for i in range(num_drivers_b)]
+    greedy, _ = schedule_day(num_buses, num_drivers_a, working_b, WEEK_DAYS[day_index] in ["СБ", "ВС"])
+    return perturbed_population(Schedule(*greedy.columns()), size, num_drivers_a, num_drivers_b, day_index,
+                                driver_b_schedule, perturbation)
+
+
+def perturbed_population(schedule, size, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+                         perturbation=0.05):
+    # само расписание + копии, где у доли perturbation рейсов сменён водитель
+    population = [schedule] if size else []
+    while len(population) < size:
+        individual = schedule.copy()
+        for _ in range(max(1, int(len(individual) * perturbation))):
+            mutate(individual, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, rate=1.0)
+        population.append(individual)
+    return population
+
+
+def truncation_selection(ranked, survivors, config):
+    # как в исходном алгоритме: родители — случайная пара из заполняемого следующего поколения survivors,
+    # то есть из лучших особей и уже добавленных в него детей; без выживших (elitism=0) — из ranked
+    pool = survivors or ranked
+    if len(pool) < 2:
+        return pool[0], pool[0]
+    parent1, parent2 = random.sample(pool, 2)
+    return parent1, parent2
+
+
+def tournament_selection(ranked, survivors, config):
+    # каждый родитель — лучший из tournament_size случайных особей; ranked отсортирован по убыванию фитнеса
+    size = min(config.tournament_size, len(ranked))
+    return tuple(ranked[min(random.sample(range(len(ranked)), size))] for _ in range(2))
+
+
+SELECTION_OPERATORS = {"truncation": truncation_selection, "tournament": tournament_selection}
+# time_aligned_crossover сюда не входит: в замерах он медленнее one_point и не лучше его;
+# его можно передать в GAConfig(crossover=...) функцией
+CROSSOVER_OPERATORS = {"one_point": crossover}
+MUTATION_OPERATORS = {"reassign_driver": mutate, "reassign_free_driver": reassign_free_driver}
+
+
+@dataclass
+class GAConfig:
+    # параметры GA; операторы задаются именем из *_OPERATORS или своей функцией;
+    # скрещивание вызывается как cross(parent1, parent2, rate, num_buses)
+    population_size: int = POPULATION_SIZE
+    generations: int = GENERATIONS
+    mutation_rate: float = MUTATION_RATE
+    crossing_rate: float = CROSSING_RATE
+    selection: object = "truncation"
+    elitism: int = None  # сколько лучших переходят без изменений; None — половина популяции
+    tournament_size: int = 3
+    crossover: object = "one_point"
+    mutation: object = "reassign_driver"
+    warm_start: float = 0.0  # доля начальной популяции из жадного расписания vlob и его возмущений
+
+    @classmethod
+    def from_globals(cls, **overrides):
+        # значения модульных констант на момент вызова
+        values = dict(population_size=POPULATION_SIZE, generations=GENERATIONS, mutation_rate=MUTATION_RATE,
+                      crossing_rate=CROSSING_RATE)
+        values.update(overrides)
+        return cls(**values)
+
+    def survivors(self):
+        return self.population_size // 2 if self.elitism is None else self.elitism
+
+
+def _operator(registry, value):
+    return registry[value] if isinstance(value, str) else value
+
+
+class GAEngine:
+    def __init__(self, config=None, instrumentation=None):
+        # instrumentation (instrumentation.Instrumentation) получает замеры каждого поколения; None — без замеров
+        self.config = GAConfig.from_globals() if config is None else config
+        self.instrumentation = instrumentation
+        self.evaluator_stats = None  # ParallelEvaluator.stats() последнего run, если оценка шла в пуле
+        self.select = _operator(SELECTION_OPERATORS, self.config.selection)
+        self.cross = _operator(CROSSOVER_OPERATORS, self.config.crossover)
+        self.mutate = _operator(MUTATION_OPERATORS, self.config.mutation)
+
+    def initial_population(self, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, stop=None):
+        # stop — см. create_initial_population; популяция может получиться меньше population_size
+        size = self.config.population_size
+        warm = min(round(size * self.config.warm_start), size)
+        population = warm_start_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+                                           warm) if warm else []
+        if population and stop is not None and stop():
+            return population
+        return population + create_initial_population(num_buses, num_drivers_a, num_drivers_b, day_index,
+                                                      driver_b_schedule, size - warm, stop)
+
+    def run(self, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, cache=None,
+            evaluator=None, workers=1, controller=None):
+        # workers > 1 — оценка популяции в постоянном пуле процессов (см. ParallelEvaluator);
+        # controller (RunController) задаёт свои условия остановки вместо config.generations;
+        # его срок отсчитывается от начала вызова, включая построение начальной популяции
+        if controller is not None:
+            controller.start()
+        population = self.initial_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+                                             None if controller is None else controller.expired)
+        is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+        if cache is None:
+            cache = FitnessCache()
+        own_evaluator = evaluator is None and workers > 1
+        if own_evaluator:
+            evaluator = ParallelEvaluator(num_buses, is_weekend, workers)
+
+        try:
+            population = self.evolve(population, self.config.generations if controller is None
+                                     else controller.max_generations,
+                                     num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, cache,
+                                     evaluator, controller)
+            #выбираем лучшее расписания по фитнесу
+            scores = cache.evaluate(population, num_buses, is_weekend, evaluator)
+        finally:
+            if evaluator is not None:
+                #статистика пула нужна и тогда, когда пул создан здесь и сейчас будет закрыт
+                self.evaluator_stats = evaluator.stats()
+                if self.instrumentation is not None:
+                    self.instrumentation.evaluator(day_index, self.evaluator_stats)
+            if own_evaluator:
+                evaluator.close()
+        best_schedule = population[int(np.argmax(scores))]
+        if controller is not None and controller.best is not None and controller.best_fitness > scores.max():
+            best_schedule = controller.best
+        return best_schedule
+
+    def evolve(self, population, generations, num_buses, num_drivers_a, num_drivers_b, day_index,
+               driver_b_schedule, cache=None, evaluator=None, controller=None):
+        # generations поколений отбора, скрещивания и мутации (None — пока controller не остановит);
+        # возвращает новую популяцию
+        config = self.config
+        is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+        if cache is None:
+            cache = FitnessCache()
+        score, select, cross, mutate = cache.evaluate, self.select, self.cross, self.mutate
+        probe = self.instrumentation
+        if probe is not None:
+            score, select, cross, mutate = (probe.timed(phase, func) for phase, func in
+                                            zip(("scoring", "selection", "crossover", "mutation"),
+                                                (score, select, cross, mutate)))
+        generation = 0
+        while generations is None or generation < generations:
+            scores = score(population, num_buses, is_weekend, evaluator)
+            order = sorted(range(len(population)), key=lambda k: scores[k], reverse=True)
+            population = [population[k] for k in order] #сортируем популяции по фитнесу
+            if controller is not None and not controller.update(generation, population, scores[order]):
+                if probe is not None:
+                    probe.generation(day_index, generation, population, scores[order], cache)
+                break
+            generation += 1
+
+            #лучшие особи переходят в следующее поколение без изменений
+            next_generation = population[:config.survivors()]
+
+            while len(next_generation) < config.population_size:
+                parent1, parent2 = select(population, next_generation, config)
+                child1, child2 = cross(parent1, parent2, config.crossing_rate, num_buses)
+                child1 = mutate(child1, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+                                config.mutation_rate)
+                child2 = mutate(child2, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+                                config.mutation_rate)
+                next_generation.extend([child1, child2]) #добавляем в конец списка
+
+            if probe is not None:
+                probe.generation(day_index, generation - 1, population, scores[order], cache)
+            population = next_generation[:config.population_size]
+
+        return population
+
+
+def genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, cache=None,
+                      evaluator=None, workers=1, controller=None, config=None, instrumentation=None):
+   return GAEngine(config, instrumentation).run(num_buses, num_drivers_a, num_drivers_b, day_index,
+                                                driver_b_schedule, cache, evaluator, workers, controller)
+
+
+def evolve(population, generations, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule,
+           cache=None, evaluator=None, controller=None, config=None, instrumentation=None):
+   return GAEngine(config, instrumentation).evolve(population, generations, num_buses, num_drivers_a,
+                                                   num_drivers_b, day_index, driver_b_schedule, cache, evaluator,
+                                                   controller)
+
+def day_seed(seed, day_index):
+    # у каждого дня свой детерминированный seed, чтобы результат не зависел от числа процессов
+    return (seed * 1_000_003 + day_index) % 2 ** 63
+
+
+def solve_day(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, seed=None, config=None):
+    # точка входа для процесса-исполнителя: дни зависят только от общего driver_b_schedule
+    if seed is not None:
+        random.seed(day_seed(seed, day_index))
+    return genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, config=config)
+
+
+def generate_weekly_schedule(num_buses, num_drivers_a, num_drivers_b, workers=1, seed=None, executor=None,
+                             config=None):
+   # workers > 1 или готовый executor — дни решаются параллельно в пуле процессов
    driver_b_schedule = assign_driver_b_schedule(num_drivers_b)
+   parallel = executor is not None or workers > 1
+   if parallel and seed is None:
+       seed = random.randrange(2 ** 32)
 
    weekly_schedule = [] #список расписаний для каждого дня недели
    daily_driver_info = {day: set() for day in WEEK_DAYS} #какие водители работают в каждый день недели
 
-   for day_index in range(len(WEEK_DAYS)):
-       best_schedule = genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
+   days = range(len(WEEK_DAYS))
+   args = (num_buses, num_drivers_a, num_drivers_b)
+   if not parallel:
+       results = (solve_day(*args, day_index, driver_b_schedule, seed, config) for day_index in days)
+   else:
+       jobs = zip(*[(*args, day_index, driver_b_schedule, seed, config) for day_index in days])
+       if executor is not None:
+           results = executor.map(solve_day, *jobs)
+       else:
+           with ProcessPoolExecutor(max_workers=workers) as pool:
+               results = list(pool.map(solve_day, *jobs))
+
+   for day_index, best_schedule in zip(days, results):
        weekly_schedule.append(best_schedule)
-       for entry in best_schedule:
-           daily_driver_info[WEEK_DAYS[day_index]].add(entry["driver_id"])
+       daily_driver_info[WEEK_DAYS[day_index]].update(best_schedule.driver_ids())
 
    return weekly_schedule, daily_driver_info
 
@@ -308,12 +1142,8 @@ def assign_driver_b_schedule(num_drivers_b):
 
 def print_schedule(schedule):
    # Рассчитываем количество активных автобусов на начало каждого маршрута
-   sorted_schedule = sorted(schedule, key=lambda x: x["start_time"])
-   active_buses = []
-
-   for trip in sorted_schedule:
-       count = len([s for s in sorted_schedule if s["start_time"] <= trip["start_time"] < s["end_time"]])
-       active_buses.append(count)
+   sorted_schedule = schedule[np.argsort(schedule.start, kind="stable")]
+   active_buses = Timeline.from_schedule(sorted_schedule).at_many(sorted_schedule.start)
 
    print(
        f"{'Автобус':<10}{'Тип водителя':<15}{'ID водителя':<15}{'Начало маршрута':<20}{'Конец маршрута':<20}{'Активные автобусы':<20}")
@@ -0,0 +1,79 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import decomposed
+from genetic import DRIVER_TYPE_B, WEEK_DAYS, day_seed, solve_day
+from vlob import schedule_day
+
+# Планирование на горизонт из любого числа дней. Цикл водителей B (рабочий день, затем два выходных)
+# идёт по абсолютному номеру дня и не начинается заново каждую неделю; номер следующего дня
+# переносится между вызовами через DriverState. При таком цикле ни один водитель B не работает
+# два дня подряд, а водители A работают только в 8:00-17:00, поэтому дни горизонта независимы
+# друг от друга и решаются параллельно.
+
+ENGINES = ("genetic", "greedy", "decomposed")
+
+
+@dataclass
+class DriverState:
+    day: int = 0  # абсолютный номер следующего дня: задаёт фазу цикла B и день недели (day % 7)
+
+
+def works_b(driver, day):
+    # driver — номер водителя B с 1, как в assign_driver_b_schedule
+    return (day - (driver - 1) % 3) % 3 == 0
+
+
+def day_rota(num_drivers_b, day):
+    # driver_b_schedule в формате genetic для одного абсолютного дня
+    weekday = WEEK_DAYS[day % 7]
+    return {f"{DRIVER_TYPE_B}{d}": [weekday] if works_b(d, day) else [] for d in range(1, num_drivers_b + 1)}
+
+
+def _solve_day(day, engine, num_buses, num_drivers_a, num_drivers_b, seed, config):
+    rota = day_rota(num_drivers_b, day)
+    if engine == "greedy":
+        random.seed(day_seed(seed, day))
+        working_b = [WEEK_DAYS[day % 7] in rota[f"{DRIVER_TYPE_B}{d}"] for d in range(1, num_drivers_b + 1)]
+        schedule, _ = schedule_day(num_buses, num_drivers_a, working_b, WEEK_DAYS[day % 7] in ["СБ", "ВС"])
+    elif engine == "decomposed":
+        random.seed(day_seed(seed, day))
+        schedule = decomposed.decomposed_algorithm(num_buses, num_drivers_a, num_drivers_b, day % 7, rota)
+    else:
+        schedule = solve_day(num_buses, num_drivers_a, num_drivers_b, day % 7, rota, day_seed(seed, day), config)
+    return schedule
+
+
+def iter_horizon(num_buses, num_drivers_a, num_drivers_b, days, state=None, engine="genetic", workers=1, seed=None,
+                 config=None):
+    # выдаёт (абсолютный день, Schedule, множество ID водителей) по порядку дней; state обновляется на месте
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    state = state if state is not None else DriverState()
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    horizon = range(state.day, state.day + days)
+    jobs = [(day, engine, num_buses, num_drivers_a, num_drivers_b, seed, config) for day in horizon]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = pool.map(_solve_day, *zip(*jobs)) if pool and jobs else (_solve_day(*job) for job in jobs)
+        for day, schedule in zip(horizon, results):
+            state.day = day + 1
+            yield day, schedule, schedule.driver_ids()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def plan_horizon(num_buses, num_drivers_a, num_drivers_b, days, state=None, engine="genetic", workers=1, seed=None,
+                 config=None):
+    # список расписаний по дням, список множеств водителей по дням и итоговый DriverState
+    state = state if state is not None else DriverState()
+    schedules, drivers = [], []
+    for _, schedule, day_drivers in iter_horizon(num_buses, num_drivers_a, num_drivers_b, days, state, engine,
+                                                 workers, seed, config):
+        schedules.append(schedule)
+        drivers.append(day_drivers)
+    return schedules, drivers, state
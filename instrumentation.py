@@ -0,0 +1,96 @@
+import cProfile
+import json
+import pstats
+import time
+
+# Замеры GA по поколениям: время оценки, отбора, скрещивания и мутации, число вызовов фитнеса,
+# лучший/средний/худший фитнес и разбивка штрафа лучшего расписания по правилам.
+# Передаётся в GAEngine / genetic_algorithm; без него цикл GA не делает лишней работы.
+
+PHASES = ("scoring", "selection", "crossover", "mutation")
+# поле записи -> счётчик FitnessCache: полная оценка, досчёт изменённых водителей/покрытия,
+# уже известный штраф, попадание в LRU-кэш
+COUNTERS = {"full_evaluations": "misses", "incremental_evaluations": "incremental", "reused_penalties": "reused",
+            "cache_hits": "hits"}
+
+
+class Instrumentation:
+    def __init__(self, *hooks):
+        self.hooks = list(hooks)  # вызываются с записью (dict) после каждого поколения
+        self._seconds = dict.fromkeys(PHASES, 0.0)
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._scored = 0
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def timed(self, phase, func):
+        # обёртка, накапливающая время func в фазе phase
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._seconds[phase] += time.perf_counter() - started
+                if phase == "scoring":
+                    self._scored += len(args[0])
+        return wrapper
+
+    def generation(self, day_index, generation, population, scores, cache):
+        # population и scores отсортированы по убыванию фитнеса
+        best = population[0].penalty
+        record = {
+            "day": day_index,
+            "generation": generation,
+            **{f"{phase}_seconds": self._seconds[phase] for phase in PHASES},
+            "fitness_calls": self._scored,
+            **{name: getattr(cache, attr) - self._counters[name] for name, attr in COUNTERS.items()},
+            "best": int(scores[0]),
+            "mean": float(scores.mean()),
+            "worst": int(scores[-1]),
+            "penalty_by_rule": best.by_rule() if best is not None and best.complete else None,
+        }
+        self._seconds = dict.fromkeys(PHASES, 0.0)
+        self._counters = {name: getattr(cache, attr) for name, attr in COUNTERS.items()}
+        self._scored = 0
+        for hook in self.hooks:
+            hook(record)
+
+    def evaluator(self, day_index, stats):
+        # итог ParallelEvaluator за прогон: одна запись {"day", "evaluator": stats} после последнего поколения
+        record = {"day": day_index, "evaluator": stats}
+        for hook in self.hooks:
+            hook(record)
+
+
+class JsonLinesSink:
+    # хук, пишущий каждую запись отдельной строкой JSON в файл или открытый поток
+    def __init__(self, target):
+        self._own = isinstance(target, str)
+        self.stream = open(target, "a", encoding="utf-8") if self._own else target
+
+    def __call__(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self._own:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def profile_call(func, *args, output=None, sort="cumulative", limit=30, **kwargs):
+    # запуск func под cProfile (например, genetic.solve_day на один день);
+    # output — файл для pstats/snakeviz, иначе сводка печатается; возвращает результат func
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    if output is not None:
+        profiler.dump_stats(output)
+    else:
+        pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+    return result
@@ -0,0 +1,88 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import genetic
+from genetic import WEEK_DAYS, FitnessCache, create_initial_population, day_seed, evolve
+from schedule import pack_schedules, unpack_schedules
+
+# Островная модель: несколько подпопуляций эволюционируют в отдельных процессах и каждые
+# migration_interval поколений обмениваются лучшими особями (по кольцу или «все со всеми»).
+
+TOPOLOGIES = ("ring", "full")
+
+
+def _island_seed(seed, island, epoch):
+    return day_seed(day_seed(seed, island), epoch)
+
+
+def _run_epoch(packed, generations, seed, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
+    # одна эпоха острова в процессе пула: расписания приходят и уходят в компактной форме
+    random.seed(seed)
+    if packed is None:
+        population = create_initial_population(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
+    else:
+        population = [schedule.copy() for schedule in unpack_schedules(*packed)]
+    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+    cache = FitnessCache()
+    population = evolve(population, generations, num_buses, num_drivers_a, num_drivers_b, day_index,
+                        driver_b_schedule, cache)
+    scores = cache.evaluate(population, num_buses, is_weekend)
+    order = np.argsort(-scores, kind="stable")
+    return pack_schedules([population[k] for k in order]), scores[order]
+
+
+def _migrate(populations, scores, migrants, topology):
+    # лучшие особи острова заменяют худших у соседей; populations отсортированы по убыванию фитнеса
+    n = len(populations)
+    incoming = [[] for _ in range(n)]
+    for i in range(n):
+        targets = [(i + 1) % n] if topology == "ring" else [j for j in range(n) if j != i]
+        for j in targets:
+            incoming[j].extend((populations[i][k], scores[i][k]) for k in range(min(migrants, len(populations[i]))))
+    for j in range(n):
+        if not incoming[j]:
+            continue
+        keep = max(len(populations[j]) - len(incoming[j]), 0)
+        pairs = list(zip(populations[j][:keep], scores[j][:keep])) + incoming[j][:len(populations[j])]
+        pairs.sort(key=lambda pair: pair[1], reverse=True)
+        populations[j] = [schedule.copy() for schedule, _ in pairs]
+        scores[j] = np.array([score for _, score in pairs])
+
+
+def island_algorithm(num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, islands=4,
+                     migration_interval=10, migrants=2, topology="ring", generations=None, workers=None,
+                     seed=None):
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"unknown topology {topology!r}, expected one of {TOPOLOGIES}")
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if generations is None:
+        generations = genetic.GENERATIONS
+    workers = min(workers or os.cpu_count() or 1, islands)
+    day = (num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        packed = [None] * islands
+        populations, scores = [None] * islands, [None] * islands
+        done, epoch = 0, 0
+        while done < generations:
+            step = min(migration_interval, generations - done)
+            jobs = [(packed[i], step, _island_seed(seed, i, epoch)) + day for i in range(islands)]
+            results = pool.map(_run_epoch, *zip(*jobs)) if pool else (_run_epoch(*job) for job in jobs)
+            for i, (island_packed, island_scores) in enumerate(results):
+                populations[i], scores[i] = unpack_schedules(*island_packed), island_scores
+            done += step
+            epoch += 1
+            if done < generations and islands > 1:
+                _migrate(populations, scores, migrants, topology)
+            packed = [pack_schedules(population) for population in populations]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best_island = max(range(islands), key=lambda i: scores[i][0])
+    return populations[best_island][0].copy()
@@ -0,0 +1,141 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from genetic import (A_FIRST, A_LAST, CODE_A, CODE_B, DRIVER_TYPE_B, ROUTE_DURATION, ROUTE_VARIATION, SLOT_TIMES,
+                     TURNAROUND, WEEK_DAYS, FitnessCache, GAConfig, GAEngine, RunController, assign_driver_b_schedule,
+                     day_seed, perturbed_population, required_buses)
+from schedule import Schedule, ScheduleBuilder
+from storage import SolvedWeek
+from timeline import BusyIndex, Timeline
+
+# Перепланирование сохранённой недели под изменившийся парк (num_buses, drivers_a, drivers_b).
+# Рейсы и назначения, которые остались допустимыми, сохраняются; рейсы списанных автобусов
+# удаляются, рейсы выбывших или не работающих в этот день водителей переназначаются,
+# недостающее покрытие добирается жадно. Затем изменённые дни коротко дорабатывает GA.
+
+
+def _day_params(num_drivers_b, day_index, driver_b_schedule):
+    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+    working_b = [d + 1 for d in range(num_drivers_b)
+                 if WEEK_DAYS[day_index] in driver_b_schedule[f"{DRIVER_TYPE_B}{d + 1}"]]
+    return is_weekend, working_b
+
+
+def _candidates(start, end, num_drivers_a, working_b, is_weekend, prefer):
+    # водители, которым рейс разрешён: A — только в будни и в окне 8:00-17:00
+    drivers_a = [(CODE_A, d) for d in range(1, num_drivers_a + 1)] \
+        if not is_weekend and A_FIRST <= start and end <= A_LAST else []
+    drivers_b = [(CODE_B, d) for d in working_b]
+    return drivers_a + drivers_b if prefer == CODE_A else drivers_b + drivers_a
+
+
+def repair_day(schedule, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
+    # убирает рейсы автобусов с номером больше num_buses и переназначает рейсы недопустимых водителей;
+    # возвращает (новое расписание, число удалённых или переназначенных рейсов)
+    is_weekend, working_b = _day_params(num_drivers_b, day_index, driver_b_schedule)
+    schedule = Schedule(*schedule.columns())
+    on_fleet = schedule.bus <= num_buses
+    valid_a = (schedule.driver_type == CODE_A) & (schedule.driver <= num_drivers_a) & (not is_weekend)
+    valid_b = (schedule.driver_type == CODE_B) & np.isin(schedule.driver, working_b)
+    valid = on_fleet & (valid_a | valid_b)
+    if valid.all():
+        return schedule, 0
+
+    kept = schedule[valid]
+    busy = BusyIndex()
+    for k in range(len(kept)):
+        busy.add((int(kept.driver_type[k]), int(kept.driver[k])), int(kept.start[k]), int(kept.end[k]))
+
+    builder = ScheduleBuilder()
+    orphans = np.flatnonzero(on_fleet & ~valid)
+    for k in orphans[np.argsort(schedule.start[orphans], kind="stable")]:
+        start, end = int(schedule.start[k]), int(schedule.end[k])
+        for key in _candidates(start, end, num_drivers_a, working_b, is_weekend, int(schedule.driver_type[k])):
+            if busy.free(key, start, end):
+                busy.add(key, start, end)
+                builder.add(int(schedule.bus[k]), key[0], key[1], start, end)
+                break
+    return Schedule.concatenate([kept, builder.build()]), int((~valid).sum())
+
+
+def fill_coverage(schedule, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule):
+    # жадно добавляет рейсы в отсчёты, где активных автобусов меньше нормы, пока есть свободные автобусы
+    # и водители; возвращает (расписание, число добавленных рейсов)
+    is_weekend, working_b = _day_params(num_drivers_b, day_index, driver_b_schedule)
+    timeline = Timeline.from_schedule(schedule)
+    buses, drivers = BusyIndex(), BusyIndex()
+    for k in range(len(schedule)):
+        start, end = int(schedule.start[k]), int(schedule.end[k])
+        buses.add(int(schedule.bus[k]), start, end)
+        drivers.add((int(schedule.driver_type[k]), int(schedule.driver[k])), start, end)
+
+    builder = ScheduleBuilder()
+    for t, need in zip(SLOT_TIMES.tolist(), required_buses(num_buses, is_weekend).tolist()):
+        missing = need - timeline.at(t)
+        if missing <= 0:
+            continue
+        end = t + ROUTE_DURATION + random.randint(-ROUTE_VARIATION, ROUTE_VARIATION)
+        free_drivers = (key for key in _candidates(t, end, num_drivers_a, working_b, is_weekend, CODE_A)
+                        if drivers.free(key, t, end))
+        for bus in range(1, num_buses + 1):
+            if missing <= 0:
+                break
+            if not buses.free(bus, t, end, TURNAROUND):
+                continue
+            key = next(free_drivers, None)
+            if key is None:
+                break
+            buses.add(bus, t, end)
+            drivers.add(key, t, end)
+            timeline.insert(t, end)
+            builder.add(bus, key[0], key[1], t, end)
+            missing -= 1
+    return Schedule.concatenate([schedule, builder.build()]), len(builder)
+
+
+def replan_day(schedule, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, generations=20,
+               time_limit=None, config=None, seed=None):
+    # нехватка покрытия добирается до нормы, в том числе та, что была в исходном решении: новые автобусы
+    # и водители должны её закрывать. Если ничего не удалено и не добавлено, день возвращается как есть
+    if seed is not None:
+        random.seed(day_seed(seed, day_index))
+    day = (num_drivers_a, num_drivers_b, day_index, driver_b_schedule)
+    with_active = schedule.active is not None
+    repaired, touched = repair_day(schedule, num_buses, *day)
+    repaired, added = fill_coverage(repaired, num_buses, *day)
+    if not touched and not added:
+        return schedule
+
+    best = repaired
+    if generations:
+        config = config or GAConfig.from_globals(population_size=20)
+        population = perturbed_population(repaired, config.population_size, *day)
+        controller = RunController(max_generations=generations, time_limit=time_limit, stagnation=generations // 2)
+        controller.start()
+        GAEngine(config).evolve(population, None, num_buses, *day, FitnessCache(), controller=controller)
+        best = controller.best
+    if with_active:
+        # колонка активных автобусов, как у расписаний vlob
+        best = Schedule(*best.columns(), Timeline.from_schedule(best).at_many(best.start))
+    return best
+
+
+def replan_week(week, num_buses, num_drivers_a, num_drivers_b, generations=20, time_limit=None, config=None,
+                workers=1, seed=None):
+    # week — storage.SolvedWeek; возвращает новый SolvedWeek под заданный парк
+    driver_b_schedule = assign_driver_b_schedule(num_drivers_b)
+    if workers > 1 and seed is None:
+        seed = random.randrange(2 ** 32)
+    jobs = [(schedule, num_buses, num_drivers_a, num_drivers_b, day_index, driver_b_schedule, generations,
+             time_limit, config, seed) for day_index, schedule in enumerate(week.weekly_schedule)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            weekly_schedule = list(pool.map(replan_day, *zip(*jobs)))
+    else:
+        weekly_schedule = [replan_day(*job) for job in jobs]
+
+    daily_driver_info = {day: schedule.driver_ids() for day, schedule in zip(WEEK_DAYS, weekly_schedule)}
+    return SolvedWeek(num_buses, num_drivers_a, num_drivers_b, weekly_schedule, daily_driver_info,
+                      driver_b_schedule)
@@ -0,0 +1,238 @@
+import bisect
+import heapq
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from genetic import (A_FIRST, A_LAST, CODE_A, CODE_B, END_TIME, LOAD_NORMAL, LOAD_PEAK, PEAK_HOURS, ROUTE_DURATION,
+                     ROUTE_VARIATION, START_TIME, TURNAROUND, WEEK_DAYS, day_seed)
+from horizon import works_b
+from schedule import Schedule, ScheduleBuilder
+from timeline import BusyIndex
+from vlob import schedule_day
+
+# Несколько маршрутов и депо. У маршрута свои автобусы, длительность рейса и профиль спроса,
+# водители принадлежат депо и общие для его маршрутов. Каждый маршрут решается отдельно
+# (жадным проходом vlob) со своей долей водителей депо — эти задачи независимы и идут в пуле процессов.
+# Затем по каждому депо и дню нехватка автобусов на маршрутах добирается свободными водителями
+# депо с любых маршрутов.
+
+SLOTS = np.arange(START_TIME * 60, END_TIME * 60, 5)  #5-минутная сетка прохода
+
+
+@dataclass(frozen=True)
+class Depot:
+    name: str
+    drivers_a: int
+    drivers_b: int
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    depot: str
+    num_buses: int
+    duration: int = ROUTE_DURATION
+    variation: int = ROUTE_VARIATION
+    load_peak: float = LOAD_PEAK
+    load_normal: float = LOAD_NORMAL
+    peak_hours: tuple = tuple(PEAK_HOURS)
+
+    def required(self, minutes, is_weekend):
+        # норма активных автобусов для массива моментов времени
+        hours = (np.asarray(minutes) // 60) % 24
+        peak = np.zeros(hours.shape, dtype=bool)
+        if not is_weekend:
+            for start, end in self.peak_hours:
+                peak |= (start <= hours) & (hours < end)
+        return np.where(peak, int(self.num_buses * self.load_peak), int(self.num_buses * self.load_normal))
+
+
+def _shares(total, weights):
+    # целые доли total пропорционально weights (метод наибольших остатков)
+    weight_sum = sum(weights)
+    if not weight_sum:
+        return [0] * len(weights)
+    exact = [total * w / weight_sum for w in weights]
+    shares = [int(x) for x in exact]
+    for k in sorted(range(len(weights)), key=lambda k: shares[k] - exact[k])[:total - sum(shares)]:
+        shares[k] += 1
+    return shares
+
+
+def partition_drivers(depot, routes):
+    # «свои» водители каждого маршрута депо: маршрут -> (номера A, номера B), пропорционально числу автобусов
+    weights = [route.num_buses for route in routes]
+    result = {route.name: ([], []) for route in routes}
+    for slot, count in ((0, depot.drivers_a), (1, depot.drivers_b)):
+        first = 1
+        for route, share in zip(routes, _shares(count, weights)):
+            result[route.name][slot].extend(range(first, first + share))
+            first += share
+    return result
+
+
+def solve_route(route, drivers_a, drivers_b, seed):
+    # неделя маршрута на его водителях; номера водителей в результате — номера в депо
+    ids_a, ids_b = np.array([0] + list(drivers_a)), np.array([0] + list(drivers_b))
+    week = []
+    for day_index, day in enumerate(WEEK_DAYS):
+        random.seed(day_seed(seed, day_index))
+        working_b = [works_b(driver, day_index) for driver in drivers_b]
+        schedule, _ = schedule_day(route.num_buses, len(drivers_a), working_b, day in ["СБ", "ВС"], route)
+        is_a = schedule.driver_type == CODE_A
+        schedule.driver[is_a] = ids_a[schedule.driver[is_a]]
+        schedule.driver[~is_a] = ids_b[schedule.driver[~is_a]]
+        week.append(schedule)
+    return week
+
+
+def _occupancy(schedule):
+    # активные автобусы маршрута в каждом отсчёте SLOTS (start <= t < end)
+    return (np.searchsorted(np.sort(schedule.start), SLOTS, "right")
+            - np.searchsorted(np.sort(schedule.end), SLOTS, "right"))
+
+
+def reconcile_day(depot, routes, schedules, day_index):
+    # добирает нехватку автобусов на маршрутах депо водителями, свободными в это время на любом маршруте;
+    # schedules: маршрут -> Schedule дня; возвращает новый словарь
+    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+    drivers = BusyIndex()
+    for schedule in schedules.values():
+        for driver_type, driver, start, end in zip(schedule.driver_type.tolist(), schedule.driver.tolist(),
+                                                   schedule.start.tolist(), schedule.end.tolist()):
+            drivers.add((driver_type, driver), start, end)
+    drivers_b = [(CODE_B, d) for d in range(1, depot.drivers_b + 1) if works_b(d, day_index)]
+    drivers_a = [(CODE_A, d) for d in range(1, depot.drivers_a + 1)] if not is_weekend else []
+
+    needy = {}  # маршрут -> (занятость по отсчётам, норма по отсчётам)
+    for route in routes:
+        counts = _occupancy(schedules[route.name])
+        required = route.required(SLOTS, is_weekend)
+        if (counts < required).any():
+            needy[route.name] = (counts, required)
+    buses = {name: BusyIndex() for name in needy}
+    for name in needy:
+        schedule = schedules[name]
+        for bus, start, end in zip(schedule.bus.tolist(), schedule.start.tolist(), schedule.end.tolist()):
+            buses[name].add(bus, start, end)
+    added = {name: ScheduleBuilder() for name in needy}
+
+    # водители в порядке предпочтения: сначала A, потом B; занятые «паркуются» в куче до освобождения
+    keys = drivers_a + drivers_b
+    ready = list(range(len(keys)))
+    parked = []  # (время, раньше которого водитель точно занят, индекс в keys)
+    for i, t in enumerate(SLOTS.tolist()):
+        while parked and parked[0][0] <= t:
+            bisect.insort(ready, heapq.heappop(parked)[1])
+        if not ready:
+            continue
+        for route in routes:
+            if route.name not in needy:
+                continue
+            counts, required = needy[route.name]
+            missing = required[i] - counts[i]
+            if missing <= 0:
+                continue
+            end = t + route.duration + random.randint(-route.variation, route.variation)
+            a_allowed = A_FIRST <= t and end <= A_LAST
+            for bus in range(1, route.num_buses + 1):
+                if missing <= 0:
+                    break
+                if not buses[route.name].free(bus, t, end, TURNAROUND):
+                    continue
+                driver, busy = None, []
+                for k in ready:
+                    key = keys[k]
+                    if key[0] == CODE_A and not a_allowed:
+                        continue
+                    until = drivers.busy_until(key, t, TURNAROUND)
+                    if until is not None:
+                        busy.append(k)
+                        heapq.heappush(parked, (until, k))
+                    elif drivers.free(key, t, end, TURNAROUND):
+                        driver = key
+                        break
+                for k in busy:
+                    ready.remove(k)
+                if driver is None:
+                    break
+                drivers.add(driver, t, end)
+                buses[route.name].add(bus, t, end)
+                counts[i:] += (SLOTS[i:] < end)
+                added[route.name].add(bus, driver[0], driver[1], t, end)
+                missing -= 1
+
+    result = {}
+    for route in routes:
+        schedule = schedules[route.name]
+        if route.name in added and len(added[route.name]):
+            merged = Schedule.concatenate([Schedule(*schedule.columns()), added[route.name].build()])
+            merged = merged[np.argsort(merged.start, kind="stable")]
+            ends = np.sort(merged.end)
+            active = np.searchsorted(merged.start, merged.start, "right") - np.searchsorted(ends, merged.start, "right")
+            schedule = Schedule(*merged.columns(), active)
+        result[route.name] = schedule
+    return result
+
+
+def reconcile_depot(depot, routes, weeks, seed):
+    # weeks: маршрут -> список Schedule по дням; возвращает (то же после согласования, {день: ID водителей})
+    random.seed(seed)
+    driver_info = {day: set() for day in WEEK_DAYS}
+    result = {route.name: list(weeks[route.name]) for route in routes}
+    for day_index, day in enumerate(WEEK_DAYS):
+        reconciled = reconcile_day(depot, routes, {name: week[day_index] for name, week in result.items()},
+                                   day_index)
+        for name, schedule in reconciled.items():
+            result[name][day_index] = schedule
+            driver_info[day].update(schedule.driver_ids())
+    return result, driver_info
+
+
+def solve_network(depots, routes, workers=1, seed=None):
+    # возвращает (маршрут -> список Schedule по дням недели, депо -> {день: множество ID водителей});
+    # результат не зависит от workers
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    depots = {depot.name: depot for depot in depots}
+    unknown = {route.depot for route in routes} - set(depots)
+    if unknown:
+        raise ValueError(f"routes reference unknown depots: {sorted(unknown)}")
+    if len({route.name for route in routes}) != len(routes):
+        raise ValueError("route names must be unique")
+    by_depot = {name: [route for route in routes if route.depot == name] for name in depots}
+
+    # этап 1: маршруты независимо, каждый на своей доле водителей депо
+    jobs = []
+    for name, depot_routes in by_depot.items():
+        shares = partition_drivers(depots[name], depot_routes)
+        jobs.extend((route, *shares[route.name]) for route in depot_routes)
+    jobs = [job + (day_seed(seed, k),) for k, job in enumerate(jobs)]
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if pool is not None:
+            weeks = list(pool.map(solve_route, *zip(*jobs), chunksize=max(1, len(jobs) // (4 * workers))))
+        else:
+            weeks = [solve_route(*job) for job in jobs]
+        weeks = {job[0].name: week for job, week in zip(jobs, weeks)}
+
+        # этап 2: согласование общих водителей внутри каждого депо, депо независимы друг от друга
+        depot_jobs = [(depots[name], depot_routes, {route.name: weeks[route.name] for route in depot_routes},
+                       day_seed(seed, len(jobs) + k)) for k, (name, depot_routes) in enumerate(by_depot.items())]
+        if pool is not None:
+            reconciled = list(pool.map(reconcile_depot, *zip(*depot_jobs)))
+        else:
+            reconciled = [reconcile_depot(*job) for job in depot_jobs]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    network, driver_info = {}, {}
+    for name, (depot_weeks, depot_drivers) in zip(by_depot, reconciled):
+        network.update(depot_weeks)
+        driver_info[name] = depot_drivers
+    return network, driver_info
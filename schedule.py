@@ -0,0 +1,223 @@
+import hashlib
+from collections.abc import Mapping
+from datetime import timedelta
+
+import numpy as np
+
+# Колоночное представление расписания на день: каждый столбец — типизированный массив,
+# одна позиция — один рейс. Время хранится в минутах от начала суток (6:00 = 360, 3:00 = 1620).
+
+DRIVER_TYPES = ("A", "B")  # код типа водителя — индекс в этом кортеже
+TYPE_CODES = {letter: code for code, letter in enumerate(DRIVER_TYPES)}
+
+TIME_DTYPE = np.int16
+INDEX_DTYPE = np.int16
+TYPE_DTYPE = np.int8
+
+COLUMNS = ("start", "end", "bus", "driver", "driver_type")
+
+
+def parse_driver_id(driver_id):
+    # "B7" -> (код типа, номер водителя)
+    return TYPE_CODES[driver_id[0]], int(driver_id[1:])
+
+
+def to_minutes(value):
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60)
+    return int(value)
+
+
+class TripView(Mapping):
+    # рейс, который выглядит как старый словарь {"bus": ..., "driver_id": ..., ...}
+    __slots__ = ("_schedule", "_index")
+
+    def __init__(self, schedule, index):
+        self._schedule = schedule
+        self._index = index
+
+    def _keys(self):
+        keys = ["bus", "driver_id", "driver_type", "start_time", "end_time"]
+        if self._schedule.active is not None:
+            keys.append("active_buses")
+        return keys
+
+    def __getitem__(self, key):
+        s, i = self._schedule, self._index
+        if key == "bus":
+            return int(s.bus[i])
+        if key == "driver_id":
+            return f"{DRIVER_TYPES[s.driver_type[i]]}{s.driver[i]}"
+        if key == "driver_type":
+            return DRIVER_TYPES[s.driver_type[i]]
+        if key == "start_time":
+            return timedelta(minutes=int(s.start[i]))
+        if key == "end_time":
+            return timedelta(minutes=int(s.end[i]))
+        if key == "active_buses" and s.active is not None:
+            return int(s.active[i])
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        s, i = self._schedule, self._index
+        if key == "driver_id":
+            s.driver_type[i], s.driver[i] = parse_driver_id(value)
+        elif key == "driver_type":
+            s.driver_type[i] = TYPE_CODES[value]
+        elif key == "bus":
+            s.bus[i] = value
+        elif key == "start_time":
+            s.start[i] = to_minutes(value)
+        elif key == "end_time":
+            s.end[i] = to_minutes(value)
+        elif key == "active_buses" and s.active is not None:
+            s.active[i] = value
+        else:
+            raise KeyError(key)
+        s.changed()
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Schedule:
+    __slots__ = ("start", "end", "bus", "driver", "driver_type", "active", "penalty", "_fingerprint")
+
+    def __init__(self, start, end, bus, driver, driver_type, active=None):
+        self.start = np.asarray(start, dtype=TIME_DTYPE)
+        self.end = np.asarray(end, dtype=TIME_DTYPE)
+        self.bus = np.asarray(bus, dtype=INDEX_DTYPE)
+        self.driver = np.asarray(driver, dtype=INDEX_DTYPE)
+        self.driver_type = np.asarray(driver_type, dtype=TYPE_DTYPE)
+        self.active = None if active is None else np.asarray(active, dtype=INDEX_DTYPE)
+        self.penalty = None  # разбивка штрафа (genetic.PenaltyBreakdown), если известна
+        self._fingerprint = None
+
+    @classmethod
+    def empty(cls, with_active=False):
+        return cls([], [], [], [], [], [] if with_active else None)
+
+    @classmethod
+    def from_records(cls, records):
+        if isinstance(records, Schedule):
+            return records
+        records = list(records)
+        with_active = bool(records) and all("active_buses" in r for r in records)
+        builder = ScheduleBuilder(with_active)
+        for r in records:
+            driver_type, driver = parse_driver_id(r["driver_id"])
+            builder.add(r["bus"], driver_type, driver, to_minutes(r["start_time"]), to_minutes(r["end_time"]),
+                        r["active_buses"] if with_active else None)
+        return builder.build()
+
+    @classmethod
+    def concatenate(cls, schedules):
+        schedules = list(schedules)
+        if not schedules:
+            return cls.empty()
+        with_active = all(s.active is not None for s in schedules)
+        return cls(*(np.concatenate([getattr(s, name) for s in schedules]) for name in COLUMNS),
+                   np.concatenate([s.active for s in schedules]) if with_active else None)
+
+    def columns(self):
+        return [getattr(self, name) for name in COLUMNS]
+
+    def to_records(self):
+        return [dict(entry) for entry in self]
+
+    def driver_ids(self):
+        # множество строковых ID водителей, как в daily_driver_info
+        pairs = np.unique(np.stack([self.driver_type, self.driver]), axis=1)
+        return {f"{DRIVER_TYPES[t]}{d}" for t, d in pairs.T}
+
+    def fingerprint(self):
+        # дешёвый отпечаток содержимого для кэша фитнеса; сбрасывается в changed()
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for column in self.columns():
+                digest.update(np.ascontiguousarray(column).tobytes())
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+    def changed(self):
+        # вызывать после любого изменения рейсов на месте
+        self._fingerprint = None
+        self.penalty = None
+
+    def copy(self):
+        copy = Schedule(*(c.copy() for c in self.columns()), None if self.active is None else self.active.copy())
+        copy.penalty = self.penalty
+        copy._fingerprint = self._fingerprint
+        return copy
+
+    def nbytes(self):
+        return sum(c.nbytes for c in self.columns()) + (0 if self.active is None else self.active.nbytes)
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("schedule index out of range")
+            return TripView(self, int(key))
+        # срез и индексный массив возвращают копию: запись в неё не должна менять родителя в обход changed()
+        if isinstance(key, slice):
+            return Schedule(*(c[key].copy() for c in self.columns()),
+                            None if self.active is None else self.active[key].copy())
+        return Schedule(*(c[key] for c in self.columns()), None if self.active is None else self.active[key])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield TripView(self, i)
+
+    def __add__(self, other):
+        if not isinstance(other, Schedule):
+            other = Schedule.from_records(other)
+        return Schedule.concatenate([self, other])
+
+    def __repr__(self):
+        return f"Schedule({len(self)} trips)"
+
+
+class ScheduleBuilder:
+    # накапливает рейсы в списках и один раз собирает из них Schedule
+    def __init__(self, with_active=False):
+        self.start, self.end, self.bus, self.driver, self.driver_type = [], [], [], [], []
+        self.active = [] if with_active else None
+
+    def add(self, bus, driver_type, driver, start, end, active=None):
+        self.start.append(start)
+        self.end.append(end)
+        self.bus.append(bus)
+        self.driver.append(driver)
+        self.driver_type.append(driver_type)
+        if self.active is not None:
+            self.active.append(active)
+
+    def __len__(self):
+        return len(self.start)
+
+    def build(self):
+        return Schedule(self.start, self.end, self.bus, self.driver, self.driver_type, self.active)
+
+
+def pack_schedules(schedules):
+    # компактная форма для передачи между процессами: длины расписаний и одна матрица int16
+    lengths = np.array([len(schedule) for schedule in schedules], dtype=np.int32)
+    merged = Schedule.concatenate(schedules)
+    return lengths, np.stack([column.astype(TIME_DTYPE) for column in merged.columns()])
+
+
+def unpack_schedules(lengths, matrix):
+    # части одной свежей матрицы больше никому не видны, поэтому без копирования
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [Schedule(*(row[a:b] for row in matrix)) for a, b in zip(bounds[:-1], bounds[1:])]
@@ -0,0 +1,124 @@
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from schedule import DRIVER_TYPES, TYPE_CODES
+
+# Модель таблицы поверх колонок Schedule: ячейки и цвета считаются только для видимых строк,
+# сортировка и фильтр — перестановка индексов строк, сами данные не копируются.
+
+HEADERS = ["Автобус", "Тип водителя", "ID водителя", "Начало маршрута", "Конец маршрута", "Активные автобусы"]
+
+
+def format_minutes(minutes, seconds=False):
+    text = f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+    return text + ":00" if seconds else text
+
+
+class ScheduleTableModel(QAbstractTableModel):
+    def __init__(self, parent=None, seconds=False, row_color=None):
+        # row_color(model, row, trip) -> QColor или None — фон строки по её позиции в таблице и номеру рейса
+        super().__init__(parent)
+        self.seconds = seconds
+        self.row_color = row_color
+        self.schedule = None
+        self.active = None
+        self._rows = np.zeros(0, dtype=np.intp)  # номера рейсов в порядке отображения
+        self._sort = None  # (колонка, порядок)
+        self._filter = ""
+
+    def set_schedule(self, schedule, active=None):
+        # active — число активных автобусов для каждого рейса (по умолчанию колонка schedule.active)
+        self.beginResetModel()
+        self.schedule = schedule
+        self.active = active if active is not None or schedule is None else schedule.active
+        self._rows = self._visible_rows()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        # номер автобуса ("3"), тип водителя ("B") или ID водителя ("B3")
+        self.beginResetModel()
+        self._filter = text.strip().upper()
+        self._rows = self._visible_rows()
+        self.endResetModel()
+
+    def trip(self, row):
+        return int(self._rows[row])
+
+    def _visible_rows(self):
+        s = self.schedule
+        if s is None:
+            return np.zeros(0, dtype=np.intp)
+        text = self._filter
+        if not text:
+            rows = np.arange(len(s))
+        elif text.isdigit():
+            rows = np.flatnonzero(s.bus == int(text))
+        elif text[0] in TYPE_CODES and (len(text) == 1 or text[1:].isdigit()):
+            mask = s.driver_type == TYPE_CODES[text[0]]
+            if len(text) > 1:
+                mask &= s.driver == int(text[1:])
+            rows = np.flatnonzero(mask)
+        else:
+            rows = np.zeros(0, dtype=np.intp)
+        return self._sorted(rows)
+
+    def _sort_keys(self, column):
+        s = self.schedule
+        if column == 0:
+            return [s.bus]
+        if column == 1:
+            return [s.driver_type]
+        if column == 2:
+            return [s.driver, s.driver_type]  #lexsort: последний ключ главный
+        if column == 3:
+            return [s.start]
+        if column == 4:
+            return [s.end]
+        return [self.active if self.active is not None else np.zeros(len(s), dtype=np.int64)]
+
+    def _sorted(self, rows):
+        if self._sort is None or not len(rows):
+            return rows
+        column, order = self._sort
+        keys = [key[rows] for key in self._sort_keys(column)]
+        rows = rows[np.lexsort(keys)]
+        return rows[::-1] if order == Qt.DescendingOrder else rows
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # column < 0 — исходный порядок рейсов
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order) if column >= 0 else None
+        self._rows = self._sorted(np.sort(self._rows))
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        k = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            s, column = self.schedule, index.column()
+            if column == 0:
+                return str(int(s.bus[k]))
+            if column == 1:
+                return DRIVER_TYPES[s.driver_type[k]]
+            if column == 2:
+                return f"{DRIVER_TYPES[s.driver_type[k]]}{s.driver[k]}"
+            if column == 3:
+                return format_minutes(int(s.start[k]), self.seconds)
+            if column == 4:
+                return format_minutes(int(s.end[k]), self.seconds)
+            return str(int(self.active[k])) if self.active is not None else ""
+        if role == Qt.BackgroundRole and self.row_color is not None:
+            return self.row_color(self, index.row(), int(k))
+        return None
@@ -0,0 +1,180 @@
+import csv
+import json
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+from schedule import COLUMNS, DRIVER_TYPES, INDEX_DTYPE, TIME_DTYPE, TYPE_DTYPE, Schedule
+
+# Сохранение решённой недели на диск: параметры парка, график водителей B и колонки
+# расписания каждого дня. Два формата с номером версии: JSON и двоичный колоночный,
+# который открывается через memmap без чтения рейсов в память.
+
+FORMAT_VERSION = 1
+
+# двоичный формат: MAGIC, версия (uint16), длина заголовка (uint32), заголовок JSON,
+# затем с выравниванием на ALIGN байт колонки всех дней подряд: start, end, bus, driver, driver_type[, active]
+MAGIC = b"BUSSCHED"
+BINARY_VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct("<8sHI")
+_DTYPES = {"start": TIME_DTYPE, "end": TIME_DTYPE, "bus": INDEX_DTYPE, "driver": INDEX_DTYPE,
+           "driver_type": TYPE_DTYPE, "active": INDEX_DTYPE}
+CSV_CHUNK = 65536  #рейсов на одну порцию при выгрузке в CSV
+
+
+@dataclass
+class SolvedWeek:
+    num_buses: int
+    drivers_a: int
+    drivers_b: int
+    weekly_schedule: list  # Schedule на каждый день недели (или горизонта)
+    daily_driver_info: dict  # день -> множество ID водителей
+    driver_b_schedule: dict  # ID водителя B -> рабочие дни
+
+
+def _day_to_json(schedule):
+    day = {name: column.tolist() for name, column in zip(COLUMNS, schedule.columns())}
+    if schedule.active is not None:
+        day["active"] = schedule.active.tolist()
+    return day
+
+
+def _day_from_json(day):
+    return Schedule(day["start"], day["end"], day["bus"], day["driver"], day["driver_type"], day.get("active"))
+
+
+def save_week(path, week):
+    data = {
+        "version": FORMAT_VERSION,
+        "num_buses": week.num_buses,
+        "drivers_a": week.drivers_a,
+        "drivers_b": week.drivers_b,
+        "driver_b_schedule": week.driver_b_schedule,
+        "daily_driver_info": {day: sorted(drivers) for day, drivers in week.daily_driver_info.items()},
+        "days": [_day_to_json(schedule) for schedule in week.weekly_schedule],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def load_week(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported schedule file version {data.get('version')!r}")
+    return SolvedWeek(
+        num_buses=data["num_buses"],
+        drivers_a=data["drivers_a"],
+        drivers_b=data["drivers_b"],
+        weekly_schedule=[_day_from_json(day) for day in data["days"]],
+        daily_driver_info={day: set(drivers) for day, drivers in data["daily_driver_info"].items()},
+        driver_b_schedule=data["driver_b_schedule"],
+    )
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def save_week_binary(path, week):
+    schedules = week.weekly_schedule
+    with_active = bool(schedules) and all(schedule.active is not None for schedule in schedules)
+    names = list(COLUMNS) + (["active"] if with_active else [])
+    total = sum(len(schedule) for schedule in schedules)
+
+    columns, offset = {}, 0
+    for name in names:
+        columns[name] = {"offset": offset, "dtype": np.dtype(_DTYPES[name]).str}
+        offset = _aligned(offset + total * np.dtype(_DTYPES[name]).itemsize)
+    header = json.dumps({
+        "num_buses": week.num_buses,
+        "drivers_a": week.drivers_a,
+        "drivers_b": week.drivers_b,
+        "driver_b_schedule": week.driver_b_schedule,
+        "daily_driver_info": {day: sorted(drivers) for day, drivers in week.daily_driver_info.items()},
+        "day_lengths": [len(schedule) for schedule in schedules],
+        "trips": total,
+        "columns": columns,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, BINARY_VERSION, len(header)))
+        f.write(header)
+        for name in names:
+            f.seek(data_start + columns[name]["offset"])
+            for schedule in schedules:
+                column = schedule.active if name == "active" else getattr(schedule, name)
+                f.write(np.ascontiguousarray(column, dtype=_DTYPES[name]).tobytes())
+        f.truncate(data_start + offset)
+
+
+def _read_header(f):
+    magic, version, length = _PREFIX.unpack(f.read(_PREFIX.size))
+    if magic != MAGIC:
+        raise ValueError("not a binary schedule file")
+    if version != BINARY_VERSION:
+        raise ValueError(f"unsupported binary schedule version {version}")
+    return json.loads(f.read(length).decode("utf-8")), _aligned(_PREFIX.size + length)
+
+
+def load_week_binary(path, mmap_mode="r"):
+    # колонки — представления над memmap файла; mmap_mode="c" разрешает правку в памяти без записи на диск
+    with open(path, "rb") as f:
+        header, data_start = _read_header(f)
+    total = header["trips"]
+    columns = {}
+    for name, info in header["columns"].items():
+        columns[name] = np.memmap(path, dtype=np.dtype(info["dtype"]), mode=mmap_mode,
+                                  offset=data_start + info["offset"], shape=(total,)) if total else \
+            np.zeros(0, dtype=np.dtype(info["dtype"]))
+    bounds = np.concatenate([[0], np.cumsum(header["day_lengths"], dtype=np.int64)]).tolist()
+    weekly_schedule = [Schedule(*(columns[name][a:b] for name in COLUMNS),
+                                columns["active"][a:b] if "active" in columns else None)
+                       for a, b in zip(bounds[:-1], bounds[1:])]
+    return SolvedWeek(
+        num_buses=header["num_buses"],
+        drivers_a=header["drivers_a"],
+        drivers_b=header["drivers_b"],
+        weekly_schedule=weekly_schedule,
+        daily_driver_info={day: set(drivers) for day, drivers in header["daily_driver_info"].items()},
+        driver_b_schedule=header["driver_b_schedule"],
+    )
+
+
+def open_week(path, mmap_mode="r"):
+    # двоичный файл или JSON — по сигнатуре в начале файла
+    with open(path, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    return load_week_binary(path, mmap_mode) if binary else load_week(path)
+
+
+def day_labels(week):
+    # названия дней из daily_driver_info, если там по ключу на каждое расписание, иначе номера дней с 1:
+    # у горизонта длиннее недели ключей дней недели меньше, чем расписаний
+    if len(week.daily_driver_info) == len(week.weekly_schedule):
+        return list(week.daily_driver_info)
+    return list(range(1, len(week.weekly_schedule) + 1))
+
+
+def export_csv(week, out, days=None):
+    # выгрузка рейсов в поток out порциями по CSV_CHUNK строк; days — названия дней по порядку расписаний
+    # (по умолчанию day_labels)
+    writer = csv.writer(out)
+    with_active = all(schedule.active is not None for schedule in week.weekly_schedule)
+    writer.writerow(["day", "bus", "driver_type", "driver_id", "start_time", "end_time"]
+                    + (["active_buses"] if with_active else []))
+    days = days if days is not None else day_labels(week)
+    for day, schedule in zip(days, week.weekly_schedule):
+        for first in range(0, len(schedule), CSV_CHUNK):
+            chunk = schedule[first:first + CSV_CHUNK]
+            letters = [DRIVER_TYPES[t] for t in chunk.driver_type.tolist()]
+            columns = [[day] * len(chunk), chunk.bus.tolist(), letters,
+                       [f"{t}{d}" for t, d in zip(letters, chunk.driver.tolist())],
+                       [f"{m // 60 % 24:02d}:{m % 60:02d}" for m in chunk.start.tolist()],
+                       [f"{m // 60 % 24:02d}:{m % 60:02d}" for m in chunk.end.tolist()]]
+            if with_active:
+                columns.append(chunk.active.tolist())
+            writer.writerows(zip(*columns))
@@ -0,0 +1,24 @@
+import random
+
+import numpy as np
+
+from genetic import (DRIVER_TYPE_A, TYPE_CODES, assign_driver_b_schedule, create_initial_population,
+                     penalty_breakdowns, time_aligned_crossover)
+
+
+def test_time_aligned_children_are_feasible():
+    num_buses, drivers_a, drivers_b = 20, 8, 15
+    random.seed(7)
+    population = create_initial_population(num_buses, drivers_a, drivers_b, 0, assign_driver_b_schedule(drivers_b), 20)
+    for _ in range(200):
+        parent1, parent2 = random.sample(population, 2)
+        for child in time_aligned_crossover(parent1, parent2, 1.0, num_buses):
+            is_a = child.driver_type == TYPE_CODES[DRIVER_TYPE_A]
+            assert not (is_a & ((child.start < 8 * 60) | (child.end > 17 * 60))).any()
+            assert child.bus.max() <= num_buses
+            rules = penalty_breakdowns([child], num_buses, False)[0].by_rule()
+            assert rules["duplicates"] == rules["overlaps"] == rules["type_a_hours"] == 0
+            for bus in np.unique(child.bus):
+                order = np.argsort(child.start[child.bus == bus])
+                start, end = child.start[child.bus == bus][order], child.end[child.bus == bus][order]
+                assert (start[1:] >= end[:-1] + 15).all()
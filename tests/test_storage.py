@@ -0,0 +1,40 @@
+import csv
+import io
+
+import numpy as np
+
+from genetic import WEEK_DAYS
+from schedule import Schedule
+from storage import SolvedWeek, export_csv, load_week, load_week_binary, save_week, save_week_binary
+
+
+def _horizon(days):
+    # по одному рейсу на день плюс ещё k рейсов в k-й день, чтобы дни различались
+    schedules = []
+    for k in range(days):
+        n = k + 1
+        start = 360 + 60 * np.arange(n)
+        schedules.append(Schedule(start, start + 55, np.arange(n) % 3, np.full(n, k % 4 + 1), np.zeros(n)))
+    # ключи только по дням недели, как у недели из приложений: их меньше, чем расписаний
+    info = {WEEK_DAYS[k % 7]: schedule.driver_ids() for k, schedule in enumerate(schedules)}
+    return SolvedWeek(3, 4, 0, schedules, info, {})
+
+
+def test_round_trip_and_csv_longer_than_week(tmp_path):
+    week = _horizon(10)
+    save_week(tmp_path / "h.json", week)
+    save_week_binary(tmp_path / "h.bin", week)
+    for loaded in (load_week(tmp_path / "h.json"), load_week_binary(tmp_path / "h.bin")):
+        assert len(loaded.weekly_schedule) == 10
+        for a, b in zip(week.weekly_schedule, loaded.weekly_schedule):
+            for x, y in zip(a.columns(), b.columns()):
+                assert np.array_equal(x, y)
+
+        out = io.StringIO()
+        export_csv(loaded, out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert len(rows) == sum(len(schedule) for schedule in week.weekly_schedule)
+        per_day = {}
+        for row in rows:
+            per_day[row["day"]] = per_day.get(row["day"], 0) + 1
+        assert per_day == {str(k + 1): k + 1 for k in range(10)}
@@ -0,0 +1,143 @@
+import bisect
+
+import numpy as np
+
+from schedule import to_minutes
+
+# Индекс занятости маршрута по минутам: сколько автобусов в рейсе в момент t (start <= t < end).
+# Точечные запросы и вставка/удаление рейса — дерево Фенвика по разностному массиву, O(log n);
+# кривая занятости и максимум/минимум на отрезке — из кэша (накопленная сумма + разреженная таблица), O(1).
+
+DAY_MINUTES = 2 * 24 * 60  # рейсы после полуночи идут как 24:00-27:00, поэтому берём двое суток
+
+
+class Timeline:
+    def __init__(self, first=0, last=DAY_MINUTES):
+        self.first = first
+        self.last = last
+        self._diff = np.zeros(last - first + 1, dtype=np.int64)
+        self._tree = [0] * (len(self._diff) + 1)
+        self._curve = None
+        self._sparse = None
+
+    @classmethod
+    def from_schedule(cls, schedule, first=0, last=DAY_MINUTES):
+        start, end = np.asarray(schedule.start, dtype=np.int64), np.asarray(schedule.end, dtype=np.int64)
+        if len(start):
+            first, last = min(first, int(start.min())), max(last, int(end.max()))
+        timeline = cls(first, last)
+        np.add.at(timeline._diff, start - first, 1)
+        np.add.at(timeline._diff, end - first, -1)
+        timeline._build_tree()
+        return timeline
+
+    def _build_tree(self):
+        # дерево Фенвика за O(n) из разностного массива
+        tree = [0] + self._diff.tolist()
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, minute, delta):
+        if not self.first <= minute <= self.last:
+            raise ValueError(f"minute {minute} is outside timeline [{self.first}, {self.last}]")
+        pos = minute - self.first
+        self._diff[pos] += delta
+        i = pos + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+        self._curve = self._sparse = None
+
+    def insert(self, start, end, count=1):
+        self._add(to_minutes(start), count)
+        self._add(to_minutes(end), -count)
+
+    def remove(self, start, end, count=1):
+        self.insert(start, end, -count)
+
+    def at(self, t):
+        t = to_minutes(t)
+        if t < self.first:
+            return 0
+        i = min(t, self.last) - self.first + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def curve(self, first=None, last=None):
+        # занятость для каждой минуты отрезка [first, last)
+        if self._curve is None:
+            self._curve = np.cumsum(self._diff)
+        first = self.first if first is None else to_minutes(first)
+        last = self.last if last is None else to_minutes(last)
+        return self._curve[max(first, self.first) - self.first:max(last, self.first) - self.first]
+
+    def at_many(self, times):
+        times = np.clip(np.asarray(times, dtype=np.int64), self.first - 1, self.last)
+        counts = self.curve(self.first, self.last + 1)
+        return np.where(times < self.first, 0, counts[np.clip(times - self.first, 0, None)])
+
+    def _table(self):
+        # разреженная таблица: уровень k хранит max/min на окнах длины 2**k
+        if self._sparse is None:
+            levels_max, levels_min = [self.curve()], [self.curve()]
+            width = 1
+            while 2 * width <= len(levels_max[-1]):
+                levels_max.append(np.maximum(levels_max[-1][:-width], levels_max[-1][width:]))
+                levels_min.append(np.minimum(levels_min[-1][:-width], levels_min[-1][width:]))
+                width *= 2
+            self._sparse = levels_max, levels_min
+        return self._sparse
+
+    def _range(self, first, last, which):
+        lo = max(to_minutes(first), self.first) - self.first
+        hi = min(to_minutes(last), self.last) - self.first
+        if lo >= hi:
+            raise ValueError("empty range")
+        levels = self._table()[which]
+        k = (hi - lo).bit_length() - 1
+        op = max if which == 0 else min
+        return int(op(levels[k][lo], levels[k][hi - (1 << k)]))
+
+    def max(self, first, last):
+        return self._range(first, last, 0)
+
+    def min(self, first, last):
+        return self._range(first, last, 1)
+
+
+class BusyIndex:
+    # занятые интервалы по ключу (автобус или водитель), отсортированные по началу;
+    # интервалы одного ключа не пересекаются
+    def __init__(self):
+        self.starts = {}
+        self.ends = {}
+
+    def add(self, key, start, end):
+        starts, ends = self.starts.setdefault(key, []), self.ends.setdefault(key, [])
+        i = bisect.bisect_right(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
+
+    def free(self, key, start, end, gap=0):
+        # свободен ли ключ на [start, end) с запасом gap минут с обеих сторон
+        starts = self.starts.get(key)
+        if not starts:
+            return True
+        i = bisect.bisect_left(starts, end + gap)
+        return i == 0 or self.ends[key][i - 1] + gap <= start
+
+    def busy_until(self, key, t, gap=0):
+        # если ключ занят в момент t (с запасом gap), — время, до которого он точно занят, иначе None
+        starts = self.starts.get(key)
+        if not starts:
+            return None
+        i = bisect.bisect_right(starts, t + gap) - 1
+        if i >= 0 and self.ends[key][i] + gap > t:
+            return self.ends[key][i] + gap
+        return None
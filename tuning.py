@@ -0,0 +1,127 @@
+import argparse
+import csv
+import itertools
+import math
+import random
+import sys
+import time
+
+from genetic import (CROSSOVER_OPERATORS, MUTATION_OPERATORS, SELECTION_OPERATORS, GAConfig, GAEngine,
+                     assign_driver_b_schedule, fitness_function, WEEK_DAYS)
+
+# Перебор параметров GA по размерам парка: для каждой комбинации — средний итоговый штраф
+# и процессорное время, чтобы выбрать самые быстрые настройки с приемлемым качеством.
+
+DEFAULT_GRID = {
+    "population_size": [20, 50],
+    "generations": [25, 50, 100],
+    "mutation_rate": [0.1, 0.3],
+    "crossing_rate": [0.5, 0.8],
+    "selection": list(SELECTION_OPERATORS),
+    "crossover": list(CROSSOVER_OPERATORS),
+    "mutation": list(MUTATION_OPERATORS),
+}
+
+FIELDS = ["num_buses", "drivers_a", "drivers_b", "population_size", "generations", "mutation_rate", "crossing_rate",
+          "selection", "crossover", "mutation", "elitism", "tournament_size", "runs", "mean_penalty", "best_penalty",
+          "mean_cpu_seconds"]
+
+
+def fleet(num_buses):
+    # водителей столько же на автобус, сколько в демонстрационной конфигурации 10/5/7
+    return num_buses, math.ceil(num_buses * 0.5), math.ceil(num_buses * 0.7)
+
+
+def configs(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield GAConfig.from_globals(**dict(zip(names, values)))
+
+
+def evaluate_config(config, num_buses, drivers_a, drivers_b, seeds, day_index=0):
+    driver_b_schedule = assign_driver_b_schedule(drivers_b)
+    is_weekend = WEEK_DAYS[day_index] in ["СБ", "ВС"]
+    penalties, cpu = [], []
+    for seed in seeds:
+        random.seed(seed)
+        started = time.process_time()
+        best = GAEngine(config).run(num_buses, drivers_a, drivers_b, day_index, driver_b_schedule)
+        cpu.append(time.process_time() - started)
+        penalties.append(-fitness_function(best, num_buses, is_weekend))
+    return {
+        "num_buses": num_buses, "drivers_a": drivers_a, "drivers_b": drivers_b,
+        "population_size": config.population_size, "generations": config.generations,
+        "mutation_rate": config.mutation_rate, "crossing_rate": config.crossing_rate,
+        "selection": config.selection, "crossover": config.crossover, "mutation": config.mutation,
+        "elitism": config.survivors(), "tournament_size": config.tournament_size,
+        "runs": len(seeds), "mean_penalty": sum(penalties) / len(penalties), "best_penalty": min(penalties),
+        "mean_cpu_seconds": sum(cpu) / len(cpu),
+    }
+
+
+def sweep(fleet_sizes, grid=None, seeds=(0, 1, 2), out=None):
+    # строки результатов пишутся в out (CSV) по мере готовности
+    writer = csv.DictWriter(out, FIELDS) if out is not None else None
+    if writer is not None:
+        writer.writeheader()
+    rows = []
+    for num_buses in fleet_sizes:
+        for config in configs(grid or DEFAULT_GRID):
+            row = evaluate_config(config, *fleet(num_buses), seeds)
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                out.flush()
+    return rows
+
+
+def fastest_acceptable(rows, max_penalty):
+    # для каждого размера парка — самая дешёвая по CPU конфигурация со штрафом не выше max_penalty
+    best = {}
+    for row in rows:
+        if row["mean_penalty"] > max_penalty(row["num_buses"]):
+            continue
+        current = best.get(row["num_buses"])
+        if current is None or row["mean_cpu_seconds"] < current["mean_cpu_seconds"]:
+            best[row["num_buses"]] = row
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Подбор параметров генетического алгоритма")
+    parser.add_argument("--fleet", type=int, nargs="+", default=[10, 50, 100], help="размеры парка")
+    parser.add_argument("--seeds", type=int, default=3, help="запусков на конфигурацию")
+    parser.add_argument("--population", type=int, nargs="+", default=DEFAULT_GRID["population_size"])
+    parser.add_argument("--generations", type=int, nargs="+", default=DEFAULT_GRID["generations"])
+    parser.add_argument("--mutation", type=float, nargs="+", default=DEFAULT_GRID["mutation_rate"])
+    parser.add_argument("--crossing", type=float, nargs="+", default=DEFAULT_GRID["crossing_rate"])
+    parser.add_argument("--selection", nargs="+", default=DEFAULT_GRID["selection"], choices=list(SELECTION_OPERATORS))
+    parser.add_argument("--crossover", nargs="+", default=DEFAULT_GRID["crossover"], choices=list(CROSSOVER_OPERATORS))
+    parser.add_argument("--mutation-operator", nargs="+", default=DEFAULT_GRID["mutation"],
+                        choices=list(MUTATION_OPERATORS))
+    parser.add_argument("--elitism", type=int, nargs="+", default=[None])
+    parser.add_argument("--max-penalty-per-bus", type=float, default=None,
+                        help="допустимый средний штраф на автобус для итоговой сводки")
+    parser.add_argument("-o", "--output", default="-", help="CSV с результатами ('-' — stdout)")
+    args = parser.parse_args(argv)
+
+    grid = {"population_size": args.population, "generations": args.generations, "mutation_rate": args.mutation,
+            "crossing_rate": args.crossing, "selection": args.selection, "crossover": args.crossover,
+            "mutation": args.mutation_operator, "elitism": args.elitism}
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        rows = sweep(args.fleet, grid, seeds=range(args.seeds), out=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.max_penalty_per_bus is not None:
+        for num_buses, row in sorted(fastest_acceptable(rows, lambda n: args.max_penalty_per_bus * n).items()):
+            print(f"{num_buses} автобусов: population={row['population_size']} generations={row['generations']} "
+                  f"mutation={row['mutation_rate']} crossing={row['crossing_rate']} selection={row['selection']} "
+                  f"crossover={row['crossover']} mutation_operator={row['mutation']} "
+                  f"-> штраф {row['mean_penalty']:.0f}, CPU {row['mean_cpu_seconds']:.2f} с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import datetime
+import heapq
 import random
 
+import numpy as np
+
+from schedule import TYPE_CODES, ScheduleBuilder, to_minutes
+from timeline import Timeline
+
 
 START_TIME = 6  # 6:00
 END_TIME = 27  # 3:00 следующего дня (27 часов от начала суток)
@@ -28,117 +35,149 @@ def is_peak_hour(current_time, is_weekend):
                                                                 # если хотя бы один элемент в последовательности — это True
 
 
-def count_active_buses(schedule, current_time):
-    return sum(
-        1 for entry in schedule
-        if entry["start_time"] <= current_time and entry["end_time"] > current_time
-    )
+# рейс в потоковом режиме; время — минуты от начала суток
+Trip = namedtuple("Trip", ["bus", "driver_type", "driver", "start", "end", "active_buses"])
 
 
-def generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b):
-    weekly_schedule = [] #cписок расписаний для каждого дня недели
-    daily_driver_info = {day: set() for day in WEEK_DAYS}  # хранение водителей для каждого дня
-
-    driver_b_work_days = {}
+def count_active_buses(schedule, current_time):
+    # schedule — Schedule, ScheduleBuilder или готовый Timeline (для повторных запросов);
+    # для разового запроса линейный проход дешевле, чем строить индекс
+    if isinstance(schedule, Timeline):
+        return schedule.at(current_time)
+    current_time = to_minutes(current_time)
+    start, end = np.asarray(schedule.start), np.asarray(schedule.end)
+    return int(np.count_nonzero((start <= current_time) & (end > current_time)))
+
+
+def iter_day(num_buses, drivers_type_a, working_b, is_weekend, route=None):
+    # жадный проход по 5-минутной сетке на очередях с приоритетом: свободные автобусы и водители
+    # выбираются с наименьшим номером, число активных автобусов ведётся по событиям начала и конца рейсов.
+    # Рейсы (Trip) выдаются по мере появления, в порядке времени начала.
+    # route (routes.Route) задаёт длительность рейса и профиль спроса; None — константы модуля
+    if route is None:
+        duration, variation, load_peak, load_normal, peak_hours = (ROUTE_DURATION, ROUTE_VARIATION, LOAD_PEAK,
+                                                                   LOAD_NORMAL, PEAK_HOURS)
+    else:
+        duration, variation, load_peak, load_normal, peak_hours = (route.duration, route.variation, route.load_peak,
+                                                                   route.load_normal, route.peak_hours)
+    current_time = START_TIME * 60  # время в минутах от начала суток
+
+    free_buses = list(range(num_buses))  # номера свободных автобусов (куча)
+    busy_buses = []  # (время освобождения, автобус)
+    free_a, busy_a = [], ([(8 * 60, i) for i in range(drivers_type_a)] if not is_weekend else []) #водители типа А свободны всегда с 8 утра
+    free_b, busy_b = [], [(0, i) for i, works in enumerate(working_b) if works] #доступны всегда с начала до конца
+    heapq.heapify(busy_a)
+    active_ends = []  # концы идущих рейсов
+
+    #обед водителей типа А
+    driver_lunch_taken = [False] * drivers_type_a
+
+    while current_time < END_TIME * 60:
+        for free, busy in ((free_buses, busy_buses), (free_a, busy_a), (free_b, busy_b)):
+            while busy and busy[0][0] <= current_time:
+                heapq.heappush(free, heapq.heappop(busy)[1])
+        while active_ends and active_ends[0] <= current_time:
+            heapq.heappop(active_ends)
+
+        hour = (current_time // 60) % 24
+        peak = not is_weekend and any(start <= hour < end for start, end in peak_hours)
+        required_buses = int(num_buses * (load_peak if peak else load_normal))
+        active_buses = len(active_ends)
+
+        while free_buses and active_buses < required_buses:
+            driver_type, driver_num = None, None
+
+            #водитель типа А с наименьшим номером; до обеда — только если уже 12:00
+            if free_a and current_time < 17 * 60:
+                absolute_hour = START_TIME + (current_time // 60) % 24
+                if absolute_hour >= 12:
+                    driver_type, driver_num = DRIVER_TYPE_A, heapq.heappop(free_a)
+                else:
+                    fed = [i for i in sorted(free_a) if driver_lunch_taken[i]]
+                    if fed:
+                        driver_type, driver_num = DRIVER_TYPE_A, fed[0]
+                        free_a.remove(fed[0])
+                        heapq.heapify(free_a)
+
+            #нет доступного водителя типа А, ищем водителя типа Б
+            if driver_type is None and free_b:
+                driver_type, driver_num = DRIVER_TYPE_B, heapq.heappop(free_b)
+
+            #если нет доступных водителей, их не будет и для остальных автобусов
+            if driver_type is None:
+                break
+
+            #генерируем время маршрута
+            route_time = duration + random.randint(-variation, variation)
+            end_time = current_time + route_time
+            bus = heapq.heappop(free_buses)
+
+            yield Trip(bus + 1, driver_type, driver_num + 1, current_time, end_time, active_buses + 1)
+
+            heapq.heappush(busy_buses, (end_time + 15, bus))
+            heapq.heappush(active_ends, end_time)
+
+            if driver_type == DRIVER_TYPE_A:
+                if not driver_lunch_taken[driver_num]:
+                    driver_lunch_taken[driver_num] = True
+                    heapq.heappush(busy_a, (end_time + 60, driver_num))  # Обед
+                else:
+                    heapq.heappush(busy_a, (end_time + 15, driver_num))
+            else:
+                heapq.heappush(busy_b, (end_time + 15, driver_num))
+
+            active_buses += 1
+
+        #обновляем текущее время с шагом в 5 минут
+        current_time += 5
+
+
+def schedule_day(num_buses, drivers_type_a, working_b, is_weekend, route=None):
+    schedule = ScheduleBuilder(with_active=True)
+    drivers = set()
+    for trip in iter_day(num_buses, drivers_type_a, working_b, is_weekend, route):
+        schedule.add(trip.bus, TYPE_CODES[trip.driver_type], trip.driver, trip.start, trip.end, trip.active_buses)
+        drivers.add(f"{trip.driver_type}{trip.driver}")
+    return schedule.build(), drivers
+
+
+def driver_b_work_days(drivers_type_b):
+    work_days = {}
     for i in range(drivers_type_b):
         start_day = i % 3  #водители типа Б сдвигаются по дням недели, чтобы равномерно распределить рабочие дни
-        driver_b_work_days[f"{DRIVER_TYPE_B}{i + 1}"] = [ # создает ID водителя, например B1,B2 и тд по индексу
+        work_days[f"{DRIVER_TYPE_B}{i + 1}"] = [ # создает ID водителя, например B1,B2 и тд по индексу
             WEEK_DAYS[j] for j in range(start_day, len(WEEK_DAYS), 3) #генерация расписания в зависимости от дня начала работы с шагом три
         ]
+    return work_days
 
+
+def _week_days(drivers_type_b):
+    work_days = driver_b_work_days(drivers_type_b)
     for day_index, day in enumerate(WEEK_DAYS):
-        is_weekend = day in ["СБ", "ВС"]
-        schedule = []
-        current_time = timedelta(hours=START_TIME)
-
-
-        driver_next_free_time = {
-            DRIVER_TYPE_A: [timedelta(hours=8)] * drivers_type_a if not is_weekend else [], #водители типа А свободны всегда с 8 утра
-            DRIVER_TYPE_B: [timedelta(hours=0)] * drivers_type_b, #доступны всегда с начала до конца
-        }
-        bus_next_free_time = [current_time] * num_buses #список из кол-ва автобусов с 6 утра
-
-        #обед водителей типа А
-        driver_lunch_taken = [False] * drivers_type_a
-
-        while current_time < timedelta(hours=END_TIME):
-            required_buses = int(num_buses * (LOAD_PEAK if is_peak_hour(current_time, is_weekend) else LOAD_NORMAL))
-            active_buses = count_active_buses(schedule, current_time)
-
-            for bus in range(num_buses):
-                if bus_next_free_time[bus] <= current_time and active_buses < required_buses:
-                    driver_type, driver_id = None, None
-
-                    #пытаемся найти водителя типа А
-                    for i, free_time in enumerate(driver_next_free_time.get(DRIVER_TYPE_A, [])):
-                        if free_time <= current_time and current_time < timedelta(hours=17):
-                            # Проверяем, взял ли водитель уже обед
-                            if not driver_lunch_taken[i]:
-                                # Проверяем, что текущее время >= 12:00
-                                absolute_hour = START_TIME + (current_time.seconds // 3600)
-                                if absolute_hour >= 12:
-                                    driver_type = DRIVER_TYPE_A
-                                    driver_id = f"{DRIVER_TYPE_A}{i + 1}"
-                                    break
-                            else:
-                                driver_type = DRIVER_TYPE_A
-                                driver_id = f"{DRIVER_TYPE_A}{i + 1}"
-                                break
-
-
-                    #нет доступного водителя типа А, ищем водителя типа Б
-                    if driver_type is None:
-                        for i, free_time in enumerate(driver_next_free_time[DRIVER_TYPE_B]):
-                            driver_b_id = f"{DRIVER_TYPE_B}{i + 1}"
-                            if free_time <= current_time and day in driver_b_work_days[driver_b_id]:
-                                driver_type = DRIVER_TYPE_B
-                                driver_id = driver_b_id
-                                break
-
-                    #если нет доступных водителей, пропускаем этот автобус
-                    if driver_type is None:
-                        continue
-
-                    #генерируем время маршрута
-                    route_time = ROUTE_DURATION + random.randint(-ROUTE_VARIATION, ROUTE_VARIATION)
-                    start_time = current_time
-                    end_time = current_time + timedelta(minutes=route_time)
-
-
-                    schedule.append({
-                        "bus": bus + 1,
-                        "driver_id": driver_id,
-                        "driver_type": driver_type,
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "active_buses": active_buses + 1
-                    })
-
-
-                    daily_driver_info[day].add(driver_id)
-
-
-                    bus_next_free_time[bus] = end_time + timedelta(minutes=15)
-
-                    if driver_type == DRIVER_TYPE_A:
-                        if not driver_lunch_taken[int(driver_id[1:]) - 1]:
-                            driver_lunch_taken[int(driver_id[1:]) - 1] = True
-                            driver_next_free_time[DRIVER_TYPE_A][int(driver_id[1:]) - 1] = end_time + timedelta(
-                                minutes=60)  # Обед
-                        else:
-
-                            driver_next_free_time[DRIVER_TYPE_A][int(driver_id[1:]) - 1] = end_time + timedelta(
-                                minutes=15)
-                    else:
-                        driver_next_free_time[DRIVER_TYPE_B][int(driver_id[1:]) - 1] = end_time + timedelta(
-                            minutes=15)
-
-                    active_buses += 1
-
-            #обновляем текущее время с шагом в 5 минут
-            current_time += timedelta(minutes=5)
-        weekly_schedule.append(schedule)
+        working_b = [day in work_days[f"{DRIVER_TYPE_B}{i + 1}"] for i in range(drivers_type_b)]
+        yield day_index, working_b, day in ["СБ", "ВС"]
 
+
+def stream_trips(num_buses, drivers_type_a, drivers_type_b):
+    # рейсы недели по одному: (номер дня, Trip); в памяти держится только состояние прохода
+    for day_index, working_b, is_weekend in _week_days(drivers_type_b):
+        for trip in iter_day(num_buses, drivers_type_a, working_b, is_weekend):
+            yield day_index, trip
+
+
+def stream_days(num_buses, drivers_type_a, drivers_type_b):
+    # расписание недели по дням: (номер дня, Schedule, множество ID водителей)
+    for day_index, working_b, is_weekend in _week_days(drivers_type_b):
+        schedule, drivers = schedule_day(num_buses, drivers_type_a, working_b, is_weekend)
+        yield day_index, schedule, drivers
+
+
+def generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b):
+    weekly_schedule = [] #cписок расписаний для каждого дня недели
+    daily_driver_info = {day: set() for day in WEEK_DAYS}  # хранение водителей для каждого дня
+    for day_index, schedule, drivers in stream_days(num_buses, drivers_type_a, drivers_type_b):
+        weekly_schedule.append(schedule)
+        daily_driver_info[WEEK_DAYS[day_index]].update(drivers)
     return weekly_schedule, daily_driver_info
 
 #для красивого вывода времени
@@ -164,34 +203,35 @@ def print_driver_info(daily_driver_info, day_index):
         print(f" - {driver}")
 
 
-# Генерация расписания на неделю
-num_buses = 10
-drivers_type_a = 5
-drivers_type_b = 5
-
-weekly_schedule, daily_driver_info = generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b)
-
-# # Просмотр расписания через консольный ввод
-# while True:
-#     print("\nВыберите опцию:")
-#     print("0-6: Просмотреть расписание на выбранный день недели")
-#     print("7: Показать сотрудников, работающих в выбранный день")
-#     print("-1: Выйти из программы")
-#
-#     try:
-#         option = int(input("Введите номер опции: "))
-#         if option == -1:
-#             print("Выход из программы.")
-#             break
-#         elif 0 <= option <= 6:
-#             print_schedule(weekly_schedule, option)
-#         elif option == 7:
-#             day_index = int(input("Введите номер дня недели (0-6): "))
-#             if 0 <= day_index <= 6:
-#                 print_driver_info(daily_driver_info, day_index)
-#             else:
-#                 print("Неверный номер дня. Попробуйте снова.")
-#         else:
-#             print("Неверный номер опции. Попробуйте снова.")
-#     except ValueError:
-#         print("Пожалуйста, введите корректное число.")
\ No newline at end of file
+if __name__ == "__main__":
+    # Генерация расписания на неделю
+    num_buses = 10
+    drivers_type_a = 5
+    drivers_type_b = 5
+
+    weekly_schedule, daily_driver_info = generate_schedule_for_week(num_buses, drivers_type_a, drivers_type_b)
+
+    # # Просмотр расписания через консольный ввод
+    # while True:
+    #     print("\nВыберите опцию:")
+    #     print("0-6: Просмотреть расписание на выбранный день недели")
+    #     print("7: Показать сотрудников, работающих в выбранный день")
+    #     print("-1: Выйти из программы")
+    #
+    #     try:
+    #         option = int(input("Введите номер опции: "))
+    #         if option == -1:
+    #             print("Выход из программы.")
+    #             break
+    #         elif 0 <= option <= 6:
+    #             print_schedule(weekly_schedule, option)
+    #         elif option == 7:
+    #             day_index = int(input("Введите номер дня недели (0-6): "))
+    #             if 0 <= day_index <= 6:
+    #                 print_driver_info(daily_driver_info, day_index)
+    #             else:
+    #                 print("Неверный номер дня. Попробуйте снова.")
+    #         else:
+    #             print("Неверный номер опции. Попробуйте снова.")
+    #     except ValueError:
+    #         print("Пожалуйста, введите корректное число.")